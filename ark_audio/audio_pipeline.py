@@ -0,0 +1,249 @@
+import queue
+import threading
+import time
+from itertools import chain
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+import speech_recognition as sr
+from ark_audio.recognizers import RecognizerBackend, GoogleBackend, iter_chunks
+from ark_audio.vad import EnergyGate
+from ark_pipeline.tracing import TRACER
+
+@dataclass
+class Transcript:
+    text: str
+    captured_at: float
+    recognized_at: float
+    # False pour une hypothèse partielle émise pendant que l'utilisateur parle
+    final: bool = True
+
+
+class AudioPipeline:
+    """
+    Pipeline audio en trois étages qui se recouvrent :
+    capture (flux micro unique et permanent) -> reconnaissance (thread dédié) -> dispatch
+    (thread appelant via `next_transcript`). La capture ne s'interrompt jamais pendant la
+    reconnaissance ou le traitement d'une phrase.
+
+    Avec un moteur streaming, la capture transmet directement les trames brutes et
+    les hypothèses partielles sont publiées au fil de l'eau (`final=False`).
+    `segments` remplace le micro par des segments audio préenregistrés.
+
+    Le bruit ambiant est calibré une seule fois à l'ouverture du micro ; avec `vad`,
+    seuls les segments de parole atteignent le moteur de reconnaissance (le silence
+    et le bruit de fond pendant l'écoute passive ne coûtent plus rien).
+    """
+
+    def __init__(self, recognizer: sr.Recognizer, mic_index: Optional[int] = 1, phrase_limit: float = 5,
+                 language: str = "fr-FR", max_pending: int = 8,
+                 backend: Optional[RecognizerBackend] = None,
+                 segments: Optional[Iterable[sr.AudioData]] = None,
+                 calibration: float = 1.0, vad: bool = True):
+        self.recognizer = recognizer
+        self.mic_index = mic_index
+        self.phrase_limit = phrase_limit
+        self.language = language
+        self.backend = backend or GoogleBackend(language, recognizer)
+        self.segments = segments
+        self.calibration = calibration
+        self.vad = vad
+        self.gate: Optional[EnergyGate] = None
+        self.audio_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_pending)
+        self.text_queue: "queue.Queue[Transcript]" = queue.Queue()
+        # Mode trames : ~16 s de tampon à 1024 échantillons par trame
+        self.frame_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=256)
+        self._format = None
+        self._format_ready = threading.Event()
+        self._frame_time = 0.0
+        self._stop = threading.Event()
+        self._threads = []
+        self.dropped = 0
+        # Segments capturés écartés par la détection de parole, et appels au moteur
+        self.skipped = 0
+        self.recognitions = 0
+        self.error: Optional[Exception] = None
+
+    @property
+    def frame_mode(self) -> bool:
+        """Flux de trames continu vers un moteur streaming (micro uniquement)."""
+        return self.backend.streaming and self.segments is None
+
+    def start(self):
+        if self.frame_mode:
+            stages = ((self._capture_frames_loop, "ark-capture"), (self._decode_frames_loop, "ark-recognize"))
+        else:
+            stages = ((self._capture_loop, "ark-capture"), (self._recognize_loop, "ark-recognize"))
+        for target, name in stages:
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _enqueue_audio(self, item):
+        try:
+            self.audio_queue.put_nowait(item)
+        except queue.Full:
+            # Reconnaissance en retard : on sacrifie le segment le plus ancien
+            try:
+                self.audio_queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self.audio_queue.put_nowait(item)
+
+    def _open_gate(self, source: sr.Microphone) -> Optional[EnergyGate]:
+        """Calibration unique du bruit ambiant, puis porte d'énergie sur le seuil obtenu."""
+        if self.calibration > 0:
+            with TRACER.span("calibration"):
+                self.recognizer.adjust_for_ambient_noise(source, duration=self.calibration)
+        if not self.vad:
+            return None
+        self.gate = EnergyGate(self.recognizer.energy_threshold, source.CHUNK / source.SAMPLE_RATE,
+                               source.SAMPLE_WIDTH)
+        return self.gate
+
+    def _capture_loop(self):
+        try:
+            if self.segments is not None:
+                for audio in self.segments:
+                    if self._stop.is_set():
+                        break
+                    self.audio_queue.put((audio, time.monotonic()))
+                return
+            with sr.Microphone(device_index=self.mic_index) as source:
+                gate = self._open_gate(source)
+                frame_bytes = source.CHUNK * source.SAMPLE_WIDTH
+                while not self._stop.is_set():
+                    try:
+                        # Timeout court pour pouvoir vérifier régulièrement la demande d'arrêt
+                        audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=self.phrase_limit)
+                    except sr.WaitTimeoutError:
+                        continue
+                    # Durée du segment capturé seulement : l'attente en silence n'est pas mesurée
+                    TRACER.record("capture", len(audio.frame_data) / (audio.sample_rate * audio.sample_width))
+                    if gate is not None and not gate.contains_speech(audio.frame_data, frame_bytes):
+                        # Bruit bref (claquement, toux) : inutile de solliciter le moteur
+                        self.skipped += 1
+                        continue
+                    self._enqueue_audio((audio, time.monotonic()))
+        except Exception as e:
+            # Micro indisponible : l'erreur est remontée au thread de dispatch
+            self.error = e
+            self._stop.set()
+
+    def _publish(self, text: str, captured_at: float, final: bool = True):
+        if text:
+            self.text_queue.put(Transcript(text, captured_at, time.monotonic(), final))
+
+    def _recognize_loop(self):
+        while not self._stop.is_set():
+            try:
+                audio, captured_at = self.audio_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            self.recognitions += 1
+            try:
+                with TRACER.span("recognition"):
+                    if self.backend.streaming:
+                        frames = iter_chunks(audio.frame_data)
+                        for hypothesis in self.backend.stream(frames, audio.sample_rate, audio.sample_width):
+                            self._publish(hypothesis.text, captured_at, hypothesis.final)
+                    else:
+                        self._publish(self.backend.transcribe(audio).lower(), captured_at)
+            except Exception:
+                # Audio incompréhensible ou service indisponible
+                continue
+
+    def _capture_frames_loop(self):
+        try:
+            with sr.Microphone(device_index=self.mic_index) as source:
+                gate = self._open_gate(source)
+                self._format = (source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+                self._format_ready.set()
+                while not self._stop.is_set():
+                    frame = source.stream.read(source.CHUNK)
+                    now = time.monotonic()
+                    # None marque la fin d'un segment de parole
+                    for item in (gate.feed(frame) if gate is not None else [frame]):
+                        self._enqueue_frame(item, now)
+        except Exception as e:
+            self.error = e
+            self._stop.set()
+
+    def _enqueue_frame(self, item: Optional[bytes], now: float):
+        try:
+            self.frame_queue.put_nowait((item, now))
+        except queue.Full:
+            if item is not None:
+                self.dropped += 1
+                return
+            # La fin de segment doit toujours passer : sans elle le flux de reconnaissance
+            # ne se termine jamais. On sacrifie la trame la plus ancienne.
+            try:
+                self.frame_queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            self.frame_queue.put_nowait((item, now))
+
+    def _frames(self) -> Iterator[bytes]:
+        """Trames du segment en cours (flux continu sans détection de parole)."""
+        while not self._stop.is_set():
+            try:
+                frame, self._frame_time = self.frame_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if frame is None:
+                return
+            yield frame
+
+    def _decode_frames_loop(self):
+        try:
+            while not self._format_ready.wait(0.5):
+                if self._stop.is_set():
+                    return
+            sample_rate, sample_width = self._format
+            while not self._stop.is_set():
+                # Un flux de reconnaissance par segment de parole
+                frames = self._frames()
+                first = next(frames, None)
+                if first is None:
+                    continue
+                self.recognitions += 1
+                for hypothesis in self.backend.stream(chain([first], frames), sample_rate, sample_width):
+                    if hypothesis.final:
+                        # Délai entre la dernière trame lue et le résultat final du moteur
+                        TRACER.record("recognition", time.monotonic() - self._frame_time)
+                    self._publish(hypothesis.text, self._frame_time, hypothesis.final)
+        except Exception as e:
+            self.error = e
+            self._stop.set()
+
+    def stats(self) -> dict:
+        stats = {"recognitions": self.recognitions, "skipped": self.skipped, "dropped": self.dropped}
+        if self.gate is not None:
+            stats.update(self.gate.stats())
+        return stats
+
+    def has_pending(self) -> bool:
+        """Vrai si une transcription attend déjà d'être traitée."""
+        return not self.text_queue.empty()
+
+    def next_transcript(self, timeout: Optional[float] = None) -> Optional[Transcript]:
+        """Prochaine transcription (partielle ou finale), ou None après `timeout`."""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            if self.error is not None:
+                raise self.error
+            wait = 0.5 if deadline is None else min(0.5, deadline - time.monotonic())
+            if wait <= 0:
+                return None
+            try:
+                return self.text_queue.get(timeout=wait)
+            except queue.Empty:
+                continue
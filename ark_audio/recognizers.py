@@ -0,0 +1,137 @@
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+import speech_recognition as sr
+
+@dataclass
+class Hypothesis:
+    text: str
+    final: bool = True
+
+
+def iter_chunks(data: bytes, size: int = 4096) -> Iterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class RecognizerBackend:
+    """
+    Interface des moteurs de reconnaissance vocale utilisés par AudioPipeline.
+
+    Un moteur non-streaming ne sait que transcrire un segment audio complet.
+    Un moteur streaming (`streaming = True`) consomme un flux de trames PCM et
+    produit des hypothèses partielles pendant que l'utilisateur parle encore.
+    """
+
+    name = "base"
+    streaming = False
+
+    def transcribe(self, audio: sr.AudioData) -> str:
+        raise NotImplementedError
+
+    def stream(self, frames: Iterable[bytes], sample_rate: int, sample_width: int) -> Iterator[Hypothesis]:
+        """Par défaut : accumule tout le flux puis le transcrit en une fois."""
+        audio = sr.AudioData(b"".join(frames), sample_rate, sample_width)
+        text = self.transcribe(audio)
+        if text:
+            yield Hypothesis(text, final=True)
+
+
+class GoogleBackend(RecognizerBackend):
+    """Service Google Speech (en ligne), le comportement historique d'ARK."""
+
+    name = "google"
+
+    def __init__(self, language: str = "fr-FR", recognizer: Optional[sr.Recognizer] = None):
+        self.language = language
+        self.recognizer = recognizer or sr.Recognizer()
+
+    def transcribe(self, audio: sr.AudioData) -> str:
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language).lower()
+        except (sr.UnknownValueError, sr.RequestError):
+            return ""
+
+
+class VoskBackend(RecognizerBackend):
+    """
+    Reconnaissance locale, hors ligne et sur CPU avec Vosk (Kaldi).
+    Modèles français : https://alphacephei.com/vosk/models (ex. vosk-model-small-fr-0.22).
+    """
+
+    name = "vosk"
+    streaming = True
+    sample_rate = 16000
+
+    def __init__(self, model_path: str):
+        try:
+            import vosk
+        except ImportError as e:
+            raise ImportError("Le moteur hors ligne nécessite vosk : pip install vosk") from e
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        self.model = vosk.Model(model_path)
+
+    def stream(self, frames: Iterable[bytes], sample_rate: int, sample_width: int) -> Iterator[Hypothesis]:
+        recognizer = self._vosk.KaldiRecognizer(self.model, sample_rate)
+        last_partial = ""
+        for frame in frames:
+            if recognizer.AcceptWaveform(frame):
+                text = json.loads(recognizer.Result()).get("text", "")
+                last_partial = ""
+                if text:
+                    yield Hypothesis(text.lower(), final=True)
+            else:
+                partial = json.loads(recognizer.PartialResult()).get("partial", "")
+                if partial and partial != last_partial:
+                    last_partial = partial
+                    yield Hypothesis(partial.lower(), final=False)
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        if text:
+            yield Hypothesis(text.lower(), final=True)
+
+    def transcribe(self, audio: sr.AudioData) -> str:
+        data = audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2)
+        finals = [h.text for h in self.stream(iter_chunks(data), self.sample_rate, 2) if h.final]
+        return " ".join(finals)
+
+
+class WavReplayBackend(RecognizerBackend):
+    """
+    Moteur de substitution pour les tests : rejoue des enregistrements WAV dont la
+    transcription est connue. `segments()` fournit l'audio à la place du micro, et
+    la transcription est retrouvée à partir du contenu audio reçu. En streaming, les
+    mots sont émis un à un comme hypothèses partielles.
+    """
+
+    name = "wav"
+    streaming = True
+
+    def __init__(self, recordings: Dict[str, str]):
+        self.recordings = recordings
+        self._segments: List[sr.AudioData] = []
+        self._transcripts: Dict[str, str] = {}
+        for path, transcript in recordings.items():
+            with sr.AudioFile(path) as source:
+                audio = sr.Recognizer().record(source)
+            self._segments.append(audio)
+            self._transcripts[self._digest(audio.frame_data)] = transcript.lower()
+
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        return hashlib.sha1(data).hexdigest()
+
+    def segments(self) -> Iterator[sr.AudioData]:
+        return iter(self._segments)
+
+    def transcribe(self, audio: sr.AudioData) -> str:
+        return self._transcripts.get(self._digest(audio.frame_data), "")
+
+    def stream(self, frames: Iterable[bytes], sample_rate: int, sample_width: int) -> Iterator[Hypothesis]:
+        text = self._transcripts.get(self._digest(b"".join(frames)), "")
+        words = text.split()
+        for i in range(1, len(words)):
+            yield Hypothesis(" ".join(words[:i]), final=False)
+        if text:
+            yield Hypothesis(text, final=True)
@@ -0,0 +1,90 @@
+import math
+from collections import deque
+from typing import List, Optional
+import numpy as np
+
+_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+def frame_rms(frame: bytes, sample_width: int = 2) -> float:
+    """Énergie RMS d'une trame PCM, dans la même unité que `Recognizer.energy_threshold`."""
+    samples = np.frombuffer(frame, dtype=_DTYPES[sample_width])
+    if samples.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+
+
+class EnergyGate:
+    """
+    Détection d'activité vocale par énergie sur les trames brutes du micro.
+
+    Un segment s'ouvre après `min_speech` secondes au-dessus du seuil (les trames
+    précédentes, jusqu'à `pre_roll`, sont conservées pour ne pas couper l'attaque du
+    premier mot) et se ferme après `hangover` secondes de silence. Seules les trames
+    d'un segment sont transmises à la reconnaissance ; `feed` renvoie None pour
+    marquer la fin d'un segment.
+    """
+
+    def __init__(self, threshold: float, frame_seconds: float, sample_width: int = 2,
+                 min_speech: float = 0.1, hangover: float = 0.8, pre_roll: float = 0.3,
+                 max_segment: float = 15.0):
+        self.threshold = threshold
+        self.sample_width = sample_width
+        self.start_frames = max(1, math.ceil(min_speech / frame_seconds))
+        self.hangover_frames = max(1, math.ceil(hangover / frame_seconds))
+        self.max_frames = max(1, math.ceil(max_segment / frame_seconds))
+        self._pre_roll = deque(maxlen=max(self.start_frames, math.ceil(pre_roll / frame_seconds)))
+        self._loud = 0
+        self._silent = 0
+        self._length = 0
+        self.active = False
+        self.frames = 0
+        self.forwarded = 0
+        self.segments = 0
+
+    def is_speech(self, frame: bytes) -> bool:
+        return frame_rms(frame, self.sample_width) > self.threshold
+
+    def feed(self, frame: bytes) -> List[Optional[bytes]]:
+        self.frames += 1
+        loud = self.is_speech(frame)
+
+        if not self.active:
+            self._pre_roll.append(frame)
+            self._loud = self._loud + 1 if loud else 0
+            if self._loud < self.start_frames:
+                return []
+            self.active = True
+            self.segments += 1
+            self._silent = 0
+            out = list(self._pre_roll)
+            self._pre_roll.clear()
+            self._length = len(out)
+            self.forwarded += len(out)
+            return out
+
+        self._length += 1
+        self._silent = 0 if loud else self._silent + 1
+        self.forwarded += 1
+        if self._silent >= self.hangover_frames or self._length >= self.max_frames:
+            self.active = False
+            self._loud = 0
+            return [frame, None]
+        return [frame]
+
+    def contains_speech(self, data: bytes, frame_bytes: int) -> bool:
+        """Vrai si un segment déjà capturé contient au moins `min_speech` de parole continue."""
+        run = 0
+        for i in range(0, len(data), frame_bytes):
+            run = run + 1 if self.is_speech(data[i:i + frame_bytes]) else 0
+            if run >= self.start_frames:
+                return True
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "forwarded": self.forwarded,
+            "segments": self.segments,
+            "threshold": round(self.threshold, 1),
+        }
@@ -1,50 +1,99 @@
 import os
-from typing import Optional, List
-from sentence_transformers import SentenceTransformer, util
-from ark_commands.subject_extractor import SubjectOfCommands, SubjectType, ExtractedSubject
+from collections import OrderedDict
+from itertools import chain, islice
+from typing import Any, Dict, Iterator, Optional, List, Tuple, Union
+from ark_commands.encoders import Encoder
+from ark_commands.subject_extractor import (SubjectOfCommands, SubjectType, ExtractedSubject, SubjectScan,
+                                            COUNT_KEYWORDS, LIST_KEYWORDS)
+from ark_commands.utterance import Utterance
+from ark_commands.intent_index import IntentIndex, GROUP_COMMANDS
+from ark_commands.tree_walker import WalkStream
+from ark_commands.catalog import load_catalog
+from ark_pipeline.tracing import TRACER
+
+# Nombre d'entrées affichées par page de liste
+PAGE_SIZE = 10
+
+# Session de l'interface vocale locale ; les clients du serveur ont la leur
+DEFAULT_SESSION = ""
 
 class ARKCommands:
-    def __init__(self, model: SentenceTransformer, base_path: str = ""):
+    def __init__(self, model: Encoder, base_path: str = "", index: Optional[IntentIndex] = None,
+                 recursive: bool = False, folder_depth: int = 2, folder_aliases: Optional[Dict[str, str]] = None,
+                 catalog: Optional[Dict[str, Any]] = None):
         self.model = model
-        self.subject_manager = SubjectOfCommands(model, base_path)
+        # Parcourir aussi les sous-dossiers même si la phrase ne le demande pas
+        self.recursive = recursive
+        self.index = index or IntentIndex(model)
+        catalog = catalog or load_catalog()
+        # Dossiers nommés reconnus dans les phrases ("dans mes factures") : profondeur et alias
+        self.subject_manager = SubjectOfCommands(model, base_path, index=self.index, folder_depth=folder_depth,
+                                                 folder_aliases=folder_aliases, catalog=catalog)
+        self.handlers = {"count": self._count_command, "list": self._list_command}
+        self._apply_commands(catalog)
+
+        # Listes en cours par session : reprises par "la suite" sans rescanner les dossiers
+        self._listings: "OrderedDict[str, List[Tuple[ExtractedSubject, Iterator[str]]]]" = OrderedDict()
+        self.max_sessions = 64
+
+    def _has_listing(self, session: str) -> bool:
+        # Lecture seule : une session n'est enregistrée que lorsqu'une liste démarre
+        return bool(self._listings.get(session))
 
+    def _store_listings(self, session: str, listings: List[Tuple[ExtractedSubject, Iterator[str]]]):
+        if not listings:
+            self._listings.pop(session, None)
+            return
+        self._listings[session] = listings
+        self._listings.move_to_end(session)
+        # Sessions abandonnées : on garde les plus récentes
+        while len(self._listings) > self.max_sessions:
+            self._listings.popitem(last=False)
+
+    def drop_session(self, session: str):
+        """Oublie les listes en cours d'une session."""
+        self._listings.pop(session, None)
+
+    def apply_catalog(self, catalog: Dict[str, Any]):
+        """Recharge phrases de commandes, exemples de sujets et extensions depuis le catalogue."""
+        self.subject_manager.apply_catalog(catalog)
+        self._apply_commands(catalog)
+
+    def _apply_commands(self, catalog: Dict[str, Any]):
         # Commandes avec contexte détaillé
-        self.commands = {
-            "combien de fichiers documents images dans le dossier": self._count_command,
-            "compter le nombre d'éléments fichiers photos vidéos": self._count_command,
-            "quel est le nombre total de documents pdf": self._count_command,
-            "lister afficher tous les fichiers du répertoire": self._list_command,
-            "montrer voir les documents images vidéos du dossier": self._list_command,
-            "afficher le contenu la liste des éléments": self._list_command,
-            "voir tous les fichiers photos dans le dossier": self._list_command
-        }
+        self.commands = {phrase: self.handlers[action]
+                         for action, phrases in catalog["commands"].items() for phrase in phrases}
         
         # Embeddings des commandes
-        self.cmd_embeddings = self.model.encode(list(self.commands.keys()))
+        self.index.set_group(GROUP_COMMANDS, {cmd: [cmd] for cmd in self.commands})
 
-    def get_best_command(self, phrase: str, threshold: float = 0.4) -> Optional[str]:
+    def get_best_command(self, phrase: Union[str, Utterance], threshold: float = 0.4,
+                         session: str = DEFAULT_SESSION) -> Optional[str]:
         try:
+            utterance = Utterance.coerce(phrase, self.model)
+
+            # Suite d'une liste précédente
+            if self._has_listing(session) and self._is_next_request(utterance):
+                return self._next_command(session)
+
             # Analyser les sujets
-            subjects = self.subject_manager.analyze_phrase(phrase)
+            subjects = self.subject_manager.analyze_phrase(utterance)
             if not subjects:
                 return None
 
             # Détection de commande par IA
-            user_emb = self.model.encode([phrase])
-            scores = util.cos_sim(user_emb, self.cmd_embeddings)[0]
-            best_score = scores.max()
+            best_cmd, best_score = self.index.best(utterance, GROUP_COMMANDS)
             
             if best_score >= threshold:
-                best_cmd = list(self.commands.keys())[scores.argmax()]
-                return self.commands[best_cmd](subjects)
+                return self.commands[best_cmd](subjects, session)
             
             # Fallback par mots-clés - seulement si score IA pas trop bas
             if best_score >= 0.2:  # Seuil minimal pour considérer le fallback
-                phrase_lower = phrase.lower()
-                if any(w in phrase_lower for w in ["combien", "nombre"]):
-                    return self._count_command(subjects)
-                elif any(w in phrase_lower for w in ["liste", "afficher", "voir"]):
-                    return self._list_command(subjects)
+                phrase_lower = utterance.normalized
+                if any(w in phrase_lower for w in COUNT_KEYWORDS):
+                    return self._count_command(subjects, session)
+                elif any(w in phrase_lower for w in LIST_KEYWORDS):
+                    return self._list_command(subjects, session)
             
             # Demande incompatible avec ARKCommands
             return None
@@ -52,24 +101,103 @@ class ARKCommands:
             # En cas d'erreur, retourner None plutôt que de planter
             return None
 
-    def _count_command(self, subjects: List[ExtractedSubject]) -> str:
-        results = []
-        for subject in subjects:
-            count = self.subject_manager.count_by_subject(subject)
-            location = os.path.basename(subject.location) or "racine"
-            results.append(f"{count} {subject.subject_type.value} dans {location}")
-        return " | ".join(results)
+    def match_lexical(self, phrase: Union[str, Utterance],
+                      session: str = DEFAULT_SESSION) -> Optional[Tuple[str, List[ExtractedSubject]]]:
+        """
+        Reconnaît une commande évidente ("combien d'images dans Bureau", "la suite")
+        sans le modèle. "la suite" n'est reconnue que si `session` a une liste en cours.
 
-    def _list_command(self, subjects: List[ExtractedSubject]) -> str:
+        Returns:
+            ("next" | "count" | "list", sujets), ou None si la phrase doit passer par les embeddings
+        """
+        utterance = Utterance.coerce(phrase, self.model)
+        if self._has_listing(session) and self._is_next_request(utterance):
+            return "next", []
+        subjects = self.subject_manager.analyze_phrase_lexical(utterance)
+        if not subjects:
+            return None
+        return ("count" if subjects[0].count_requested else "list"), subjects
+
+    def run_lexical(self, action: str, subjects: List[ExtractedSubject],
+                    session: str = DEFAULT_SESSION) -> Optional[str]:
+        """Exécute une commande reconnue par `match_lexical`."""
+        try:
+            if action == "next":
+                return self._next_command(session)
+            return self.handlers[action](subjects, session)
+        except Exception:
+            return None
+
+    def _count_command(self, subjects: List[ExtractedSubject], session: str = DEFAULT_SESSION) -> str:
+        # `session` : signature commune des commandes, un compte ne pagine pas
+        # Un seul parcours par dossier, quel que soit le nombre de types demandés
+        # limit=0 : seuls les comptes sont utiles, aucun nom n'est conservé
+        scans = self.subject_manager.scan_subjects(subjects, recursive=self.recursive, limit=0)
+        with TRACER.span("format"):
+            return self._format_counts(subjects, scans)
+
+    def _format_counts(self, subjects: List[ExtractedSubject], scans: List[SubjectScan]) -> str:
         results = []
-        for subject in subjects:
-            files = self.subject_manager.get_files_by_subject(subject)[:10]  # Max 10
+        for subject, scan in zip(subjects, scans):
             location = os.path.basename(subject.location) or "racine"
-            
-            if files:
-                file_list = "\n".join([f"  • {f}" for f in files])
-                results.append(f"{subject.subject_type.value.title()} dans {location}:\n{file_list}")
+            if subject.recursive or self.recursive:
+                prefix = "au moins " if scan.truncated else ""
+                results.append(f"{prefix}{scan.count} {subject.subject_type.value} dans {location} (sous-dossiers inclus)")
             else:
-                results.append(f"Aucun {subject.subject_type.value} dans {location}")
+                results.append(f"{scan.count} {subject.subject_type.value} dans {location}")
+        return " | ".join(results)
+
+    def _list_command(self, subjects: List[ExtractedSubject], session: str = DEFAULT_SESSION) -> str:
+        pending = []
+        streams = self.subject_manager.iter_subjects(subjects, recursive=self.recursive)
+        results = [self._format_page(subject, entries, pending) for subject, entries in zip(subjects, streams)]
+        self._store_listings(session, pending)
         
-        return "\n\n".join(results)
\ No newline at end of file
+        return "\n\n".join(results)
+
+    def _next_command(self, session: str = DEFAULT_SESSION) -> str:
+        listings, pending = self._listings.get(session, []), []
+        text = "\n\n".join(self._format_page(subject, entries, pending, continued=True)
+                           for subject, entries in listings)
+        self._store_listings(session, pending)
+        return text
+
+    def _is_next_request(self, utterance: Utterance) -> bool:
+        return any(w in utterance.normalized for w in ["la suite", "suivant", "continue", "la page d'apres"])
+
+    def _format_page(self, subject: ExtractedSubject, entries: Iterator[str],
+                     pending: List[Tuple[ExtractedSubject, Iterator[str]]], continued: bool = False) -> str:
+        """Formate une page de la liste et ajoute l'itérateur à `pending` si d'autres entrées suivent."""
+        with TRACER.span("fs_scan"):
+            files = list(islice(entries, PAGE_SIZE + 1))
+        with TRACER.span("format"):
+            return self._format_files(subject, entries, files, pending, continued)
+
+    def _format_files(self, subject: ExtractedSubject, entries: Iterator[str], files: List[str],
+                      pending: List[Tuple[ExtractedSubject, Iterator[str]]], continued: bool) -> str:
+        location = os.path.basename(subject.location) or "racine"
+        # Parcours récursif interrompu par ses garde-fous : la fin de liste n'est pas la fin réelle
+        truncated = isinstance(entries, WalkStream) and entries.truncated
+
+        if len(files) > PAGE_SIZE:
+            # Remettre l'entrée lue en trop devant le reste de l'itérateur
+            rest = chain(files[PAGE_SIZE:], entries)
+            if isinstance(entries, WalkStream):
+                rest = WalkStream(rest, entries.status)
+            pending.append((subject, rest))
+            files = files[:PAGE_SIZE]
+            truncated = False
+
+        incomplete = " (liste incomplète : parcours interrompu, dossiers trop profonds ou trop longs à lire)"
+        if not files:
+            if continued:
+                return f"Plus d'autres {subject.subject_type.value} dans {location}" + (incomplete if truncated else "")
+            return f"Aucun {subject.subject_type.value} dans {location}" + (incomplete if truncated else "")
+
+        file_list = "\n".join([f"  • {f}" for f in files])
+        text = f"{subject.subject_type.value.title()} dans {location}:\n{file_list}"
+        if pending and pending[-1][0] is subject:
+            text += "\n  … dis « la suite » pour voir les suivants"
+        elif truncated:
+            text += "\n  …" + incomplete
+        return text
\ No newline at end of file
@@ -0,0 +1,141 @@
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Protocol
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+
+# Sections obligatoires et leur type JSON
+_SECTIONS = {
+    "responses": dict,
+    "sleep": dict,
+    "unknown_response": str,
+    "commands": dict,
+    "actions": dict,
+    "subjects": dict,
+}
+
+# Actions de commande connues d'ARKCommands
+COMMAND_ACTIONS = ("count", "list")
+
+
+def _is_phrase_list(value: Any) -> bool:
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def validate_catalog(catalog: Any, path: str = "") -> Dict[str, Any]:
+    """Vérifie le contenu complet du catalogue ; lève ValueError à la première entrée invalide."""
+    # Import tardif : subject_extractor dépend lui-même de ce module
+    from ark_commands.subject_extractor import SubjectType
+
+    def fail(message: str):
+        raise ValueError(f"Catalogue {path} : {message}")
+
+    if not isinstance(catalog, dict):
+        fail("objet JSON attendu")
+    for section, kind in _SECTIONS.items():
+        if not isinstance(catalog.get(section), kind):
+            fail(f"section '{section}' absente ou invalide")
+
+    for trigger, entry in catalog["responses"].items():
+        if not isinstance(entry, dict) or not isinstance(entry.get("reply"), str):
+            fail(f"réponse '{trigger}' sans 'reply'")
+        if not _is_phrase_list(entry.get("keywords", [])):
+            fail(f"mots-clés invalides pour '{trigger}'")
+    sleep = catalog["sleep"]
+    if not isinstance(sleep.get("trigger"), str) or not _is_phrase_list(sleep.get("keywords", [])):
+        fail("section 'sleep' : 'trigger' ou 'keywords' invalide")
+
+    for action, phrases in catalog["commands"].items():
+        if action not in COMMAND_ACTIONS:
+            fail(f"action de commande inconnue '{action}' (attendu : {', '.join(COMMAND_ACTIONS)})")
+        if not _is_phrase_list(phrases):
+            fail(f"phrases invalides pour la commande '{action}'")
+    for action, phrases in catalog["actions"].items():
+        if not _is_phrase_list(phrases):
+            fail(f"exemples invalides pour l'action '{action}'")
+
+    known = {stype.value for stype in SubjectType}
+    for name, entry in catalog["subjects"].items():
+        if name not in known:
+            fail(f"type de sujet inconnu '{name}' (attendu : {', '.join(sorted(known))})")
+        if not isinstance(entry, dict) or not _is_phrase_list(entry.get("examples", [])) \
+                or not _is_phrase_list(entry.get("extensions", [])):
+            fail(f"sujet '{name}' invalide")
+    return catalog
+
+
+def load_catalog(path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Lit le catalogue d'intentions (réponses, phrases de commandes, exemples de sujets
+    et extensions par type). Lève ValueError si le fichier est mal formé ou si une
+    entrée est invalide.
+    """
+    path = path or DEFAULT_CATALOG_PATH
+    with open(path, "r", encoding="utf-8") as f:
+        try:
+            catalog = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Catalogue illisible ({path}) : {e}") from e
+    return validate_catalog(catalog, path)
+
+
+class CatalogConsumer(Protocol):
+    def apply_catalog(self, catalog: Dict[str, Any]): ...
+
+
+class CatalogWatcher:
+    """
+    Recharge le catalogue à chaud quand son fichier change (mtime), vérification
+    espacée de `check_interval` secondes. `refresh` est appelé par le thread de
+    dispatch au début de chaque tour : les composants ne sont jamais modifiés
+    pendant un scoring. Un fichier invalide (en cours d'édition) est ignoré et
+    l'ancien catalogue reste actif sur tous les composants.
+    """
+
+    def __init__(self, consumers: List[CatalogConsumer], path: Optional[str] = None,
+                 check_interval: float = 2.0, catalog: Optional[Dict[str, Any]] = None):
+        self.path = path or DEFAULT_CATALOG_PATH
+        self.consumers = consumers
+        # Dernier catalogue appliqué avec succès, rétabli si une application échoue
+        self.catalog = catalog if catalog is not None else load_catalog(self.path)
+        self.check_interval = check_interval
+        self._mtime_ns = self._stat()
+        self._checked_at = time.monotonic()
+        self.reloads = 0
+        self.error: Optional[Exception] = None
+
+    def _stat(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def refresh(self, force: bool = False) -> bool:
+        """Recharge si le fichier a changé ; retourne True si un nouveau catalogue a été appliqué."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        mtime_ns = self._stat()
+        if not force and (mtime_ns is None or mtime_ns == self._mtime_ns):
+            return False
+        self._mtime_ns = mtime_ns
+        try:
+            catalog = load_catalog(self.path)
+        except (OSError, ValueError) as e:
+            self.error = e
+            return False
+        try:
+            for consumer in self.consumers:
+                consumer.apply_catalog(catalog)
+        except (KeyError, TypeError, ValueError) as e:
+            # Tous les composants reviennent au même catalogue
+            for consumer in self.consumers:
+                consumer.apply_catalog(self.catalog)
+            self.error = e
+            return False
+        self.catalog = catalog
+        self.error = None
+        self.reloads += 1
+        return True
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+from ark_commands.encoders import Encoder
+from ark_pipeline.tracing import TRACER
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "ark", "embeddings")
+
+
+class EmbeddingCache:
+    """
+    Cache disque des embeddings de phrases d'ancrage, adressé par contenu.
+
+    Chaque phrase est identifiée par sha1(nom du modèle + phrase). Les vecteurs sont
+    stockés bruts (float32) dans un fichier `.f32` ouvert en mémoire mappée, et la
+    correspondance clé -> ligne dans un index `.json` voisin. Seules les phrases
+    absentes du cache sont envoyées au modèle ; leurs vecteurs sont ajoutés en fin de
+    fichier sans réécrire les lignes existantes. Les lignes des phrases retirées du
+    catalogue restent dans le fichier jusqu'au prochain `compact`.
+    """
+
+    def __init__(self, model: Encoder, model_name: str, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.model = model
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        slug = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:16]
+        self.matrix_path = os.path.join(cache_dir, f"{slug}.f32")
+        self.index_path = os.path.join(cache_dir, f"{slug}.json")
+        self._rows: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._dim: Optional[int] = None
+        # Faux après une erreur disque : le cache continue en mémoire seulement
+        self._persist = True
+        self._load()
+
+    def _key(self, phrase: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{phrase}".encode("utf-8")).hexdigest()
+
+    def _map(self) -> Optional[np.ndarray]:
+        # Une ligne incomplète en fin de fichier (écriture interrompue) est ignorée
+        count = os.path.getsize(self.matrix_path) // (self._dim * 4)
+        if count == 0:
+            return None
+        return np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(count, self._dim))
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            rows, self._dim = dict(meta["rows"]), int(meta["dim"])
+            matrix = self._map()
+        except (OSError, ValueError, KeyError, TypeError):
+            self._dim = None
+            return
+        if rows and (matrix is None or max(rows.values()) >= len(matrix)):
+            # Index et matrice désynchronisés : on repart d'un cache vide
+            self._dim = None
+            return
+        self._rows = rows
+        self._matrix = matrix
+
+    def _write_index(self):
+        fd, tmp_index = tempfile.mkstemp(dir=self.cache_dir, suffix=".json.tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"dim": self._dim, "rows": self._rows}, f)
+            os.replace(tmp_index, self.index_path)
+        except BaseException:
+            os.unlink(tmp_index)
+            raise
+
+    def _append(self, new: np.ndarray):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        size = len(self._matrix) * self._dim * 4 if self._matrix is not None else 0
+        # Libérer le mapping avant de modifier le fichier
+        self._matrix = None
+        with open(self.matrix_path, "ab") as f:
+            f.truncate(size)
+            f.write(np.ascontiguousarray(new, dtype=np.float32).tobytes())
+        self._write_index()
+        self._matrix = self._map()
+
+    def __contains__(self, phrase: str) -> bool:
+        return self._key(phrase) in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def encode(self, phrases: Sequence[str]) -> np.ndarray:
+        """Retourne les embeddings de `phrases` en n'encodant que les phrases nouvelles."""
+        keys = [self._key(p) for p in phrases]
+        missing: List[str] = []
+        missing_keys = set()
+        for phrase, key in zip(phrases, keys):
+            if key not in self._rows and key not in missing_keys:
+                missing.append(phrase)
+                missing_keys.add(key)
+
+        if missing:
+            with TRACER.span("encode_anchors"):
+                new = np.asarray(self.model.encode(missing, convert_to_numpy=True), dtype=np.float32)
+            previous = self._matrix
+            offset = len(previous) if previous is not None else 0
+            for i, phrase in enumerate(missing):
+                self._rows[self._key(phrase)] = offset + i
+            self._dim = new.shape[1]
+            try:
+                if not self._persist:
+                    raise OSError("cache en mémoire seulement")
+                self._append(new)
+            except OSError:
+                # Disque indisponible : le cache reste valable en mémoire
+                self._persist = False
+                self._matrix = new if previous is None else np.concatenate([np.asarray(previous), new])
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.asarray(self._matrix[[self._rows[k] for k in keys]], dtype=np.float32)
+
+    def compact(self, keep: Iterable[str]) -> int:
+        """
+        Ne garde que les lignes des phrases `keep` (les phrases d'ancrage actuelles) et
+        réécrit le fichier si d'autres lignes s'y trouvent. Retourne le nombre de lignes
+        supprimées.
+        """
+        if self._matrix is None:
+            return 0
+        keys = {self._key(phrase) for phrase in keep}
+        kept = {key: row for key, row in self._rows.items() if key in keys}
+        removed = len(self._matrix) - len(kept)
+        if removed == 0:
+            return 0
+        matrix = np.asarray(self._matrix[list(kept.values())], dtype=np.float32)
+        self._rows = {key: i for i, key in enumerate(kept)}
+        if not self._persist:
+            self._matrix = matrix
+            return removed
+        self._matrix = None
+        fd, tmp_matrix = tempfile.mkstemp(dir=self.cache_dir, suffix=".f32.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(matrix.tobytes())
+            os.replace(tmp_matrix, self.matrix_path)
+            self._write_index()
+        except OSError:
+            if os.path.exists(tmp_matrix):
+                os.unlink(tmp_matrix)
+            self._persist = False
+            self._matrix = matrix
+            return removed
+        self._matrix = self._map() if len(matrix) else None
+        return removed
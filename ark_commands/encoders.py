@@ -0,0 +1,72 @@
+from typing import Optional, Protocol, Sequence
+import numpy as np
+
+DEFAULT_MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+BACKENDS = ("torch", "int8", "onnx")
+
+
+class Encoder(Protocol):
+    """
+    Interface commune des encodeurs de phrases utilisés par ARKResponses, ARKCommands
+    et SubjectExtractor. Un `SentenceTransformer` la respecte tel quel.
+    """
+
+    def encode(self, sentences: Sequence[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        ...
+
+
+class SentenceEncoder:
+    """Encodeur basé sur sentence-transformers, identifié par modèle et moteur d'inférence."""
+
+    def __init__(self, model, model_name: str, backend: str):
+        self.model = model
+        self.model_name = model_name
+        self.backend = backend
+
+    @property
+    def name(self) -> str:
+        """Identifiant stable, utilisé comme clé du cache d'embeddings sur disque."""
+        return self.model_name if self.backend == "torch" else f"{self.model_name}#{self.backend}"
+
+    def encode(self, sentences: Sequence[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        kwargs.setdefault("show_progress_bar", False)
+        return self.model.encode(list(sentences), convert_to_numpy=convert_to_numpy, **kwargs)
+
+
+def load_torch_encoder(model_name: str = DEFAULT_MODEL_NAME) -> SentenceEncoder:
+    """Modèle PyTorch pleine précision (référence)."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceEncoder(SentenceTransformer(model_name, device='cpu'), model_name, "torch")
+
+
+def load_int8_encoder(model_name: str = DEFAULT_MODEL_NAME) -> SentenceEncoder:
+    """Quantification dynamique int8 des couches linéaires (PyTorch, CPU)."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(model_name, device='cpu')
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return SentenceEncoder(model, model_name, "int8")
+
+
+def load_onnx_encoder(model_name: str = DEFAULT_MODEL_NAME, file_name: Optional[str] = None) -> SentenceEncoder:
+    """
+    Inférence ONNX Runtime (pip install "sentence-transformers[onnx]").
+    `file_name` permet de choisir une variante quantifiée, ex. "onnx/model_qint8_avx2.onnx".
+    """
+    from sentence_transformers import SentenceTransformer
+    model_kwargs = {"file_name": file_name} if file_name else None
+    model = SentenceTransformer(model_name, device='cpu', backend="onnx", model_kwargs=model_kwargs)
+    backend = "onnx" if not file_name else f"onnx:{file_name}"
+    return SentenceEncoder(model, model_name, backend)
+
+
+def load_encoder(backend: str = "torch", model_name: str = DEFAULT_MODEL_NAME,
+                 onnx_file: Optional[str] = None) -> SentenceEncoder:
+    if backend == "torch":
+        return load_torch_encoder(model_name)
+    if backend == "int8":
+        return load_int8_encoder(model_name)
+    if backend == "onnx":
+        return load_onnx_encoder(model_name, onnx_file)
+    raise ValueError(f"Moteur d'encodage inconnu : {backend} (choix : {', '.join(BACKENDS)})")
+
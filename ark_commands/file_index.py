@@ -0,0 +1,122 @@
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+# Un dossier modifié moins de 2 s avant son scan peut encore changer dans le même
+# tick de mtime : on le rescanne à la prochaine requête par sécurité.
+_RACY_WINDOW_NS = 2_000_000_000
+
+
+@dataclass
+class FolderSnapshot:
+    """Contenu d'un dossier au moment du scan, classé par type."""
+    path: str
+    mtime_ns: int
+    scanned_ns: int
+    files: List[str] = field(default_factory=list)
+    folders: List[str] = field(default_factory=list)
+    by_type: Dict[Hashable, List[str]] = field(default_factory=dict)
+
+    @property
+    def stable(self) -> bool:
+        return self.scanned_ns - self.mtime_ns > _RACY_WINDOW_NS
+
+
+class FileIndex:
+    """
+    Index en mémoire du contenu des dossiers consultés.
+
+    Chaque dossier est lu avec `os.scandir` (le type d'entrée vient de d_type, sans
+    stat supplémentaire) puis ses fichiers sont répartis par type via la table
+    extension -> types. Un dossier n'est relu que si son mtime a changé.
+    """
+
+    def __init__(self, type_extensions: Dict[Hashable, Sequence[str]], max_folders: int = 64):
+        self.max_folders = max_folders
+        self.ext_to_types: Dict[str, List[Hashable]] = {}
+        self._snapshots: "OrderedDict[str, FolderSnapshot]" = OrderedDict()
+        self.scans = 0
+        self.set_type_extensions(type_extensions)
+
+    def set_type_extensions(self, type_extensions: Dict[Hashable, Sequence[str]]):
+        """Remplace la table extension -> types ; les dossiers seront reclassés au prochain accès."""
+        ext_to_types: Dict[str, List[Hashable]] = {}
+        for stype, extensions in type_extensions.items():
+            for ext in extensions:
+                ext_to_types.setdefault(ext.lower(), []).append(stype)
+        if ext_to_types != self.ext_to_types:
+            self.ext_to_types = ext_to_types
+            self._snapshots.clear()
+
+    def _scan(self, path: str, mtime_ns: int) -> FolderSnapshot:
+        snapshot = FolderSnapshot(path=path, mtime_ns=mtime_ns, scanned_ns=time.time_ns())
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        snapshot.folders.append(entry.name)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                snapshot.files.append(entry.name)
+                for stype in self.ext_to_types.get(os.path.splitext(entry.name)[1].lower(), ()):
+                    snapshot.by_type.setdefault(stype, []).append(entry.name)
+        self.scans += 1
+        return snapshot
+
+    def snapshot(self, path: str) -> FolderSnapshot:
+        """
+        Retourne le contenu indexé de `path`, rafraîchi si le dossier a changé.
+        Lève FileNotFoundError / PermissionError comme `os.scandir`.
+        """
+        path = os.path.abspath(path)
+        mtime_ns = os.stat(path).st_mtime_ns
+        snapshot = self._snapshots.get(path)
+        if snapshot is not None and snapshot.mtime_ns == mtime_ns and snapshot.stable:
+            self._snapshots.move_to_end(path)
+            return snapshot
+
+        snapshot = self._scan(path, mtime_ns)
+        self._snapshots[path] = snapshot
+        self._snapshots.move_to_end(path)
+        while len(self._snapshots) > self.max_folders:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def cached(self, path: str) -> Optional[FolderSnapshot]:
+        """Retourne le contenu indexé de `path` s'il est encore à jour, sans rescanner."""
+        path = os.path.abspath(path)
+        snapshot = self._snapshots.get(path)
+        if snapshot is None or not snapshot.stable:
+            return None
+        try:
+            if os.stat(path).st_mtime_ns != snapshot.mtime_ns:
+                return None
+        except OSError:
+            return None
+        return snapshot
+
+    def iter_scan(self, path: str) -> Iterator[Tuple[str, bool]]:
+        """Lecture paresseuse de `path` : produit (nom, est_un_dossier) sans tout matérialiser."""
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir():
+                            yield entry.name, True
+                        elif entry.is_file():
+                            yield entry.name, False
+                    except OSError:
+                        continue
+        except (FileNotFoundError, PermissionError, NotADirectoryError):
+            return
+
+    def invalidate(self, path: str = ""):
+        if path:
+            self._snapshots.pop(os.path.abspath(path), None)
+        else:
+            self._snapshots.clear()
@@ -0,0 +1,139 @@
+import bisect
+import difflib
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from ark_commands.utils import normalize_phrase
+
+# Noms usuels (normalisés) -> dossier réel, relatif au dossier de base
+DEFAULT_ALIASES = {
+    "bureau": "Desktop",
+    "telechargements": "Downloads",
+    "telechargement": "Downloads",
+    "photos": "Pictures",
+    "images": "Pictures",
+    "musique": "Music",
+    "musiques": "Music",
+    "videos": "Videos",
+    "documents": "Documents",
+}
+
+
+class FolderNameIndex:
+    """
+    Index des noms de dossiers sous `base_path` pour résoudre les lieux cités à l'oral.
+
+    Les noms sont normalisés (minuscules, sans accents) et triés pour permettre une
+    recherche exacte, par préfixe, par sous-chaîne puis approximative. L'index couvre
+    `max_depth` niveaux et n'est reconstruit que lorsqu'un dossier indexé a changé
+    (mtime), vérification elle-même espacée de `check_interval` secondes.
+    """
+
+    def __init__(self, base_path: str, max_depth: int = 2, aliases: Optional[Dict[str, str]] = None,
+                 check_interval: float = 5.0, max_folders: int = 20000):
+        self.base_path = base_path
+        self.max_depth = max_depth
+        self.aliases = {normalize_phrase(k): v for k, v in (DEFAULT_ALIASES if aliases is None else aliases).items()}
+        self.check_interval = check_interval
+        self.max_folders = max_folders
+        # (nom normalisé, profondeur, chemin) trié par nom
+        self._entries: List[Tuple[str, int, str]] = []
+        self._keys: List[str] = []
+        self._mtimes: Dict[str, int] = {}
+        self._checked_at = 0.0
+        self.builds = 0
+
+    def add_alias(self, name: str, target: str):
+        """`target` est un chemin absolu ou relatif à `base_path`."""
+        self.aliases[normalize_phrase(name)] = target
+
+    def _build(self):
+        entries, mtimes = [], {}
+        queue = [(self.base_path, 0)]
+        while queue and len(entries) < self.max_folders:
+            path, depth = queue.pop(0)
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+                with os.scandir(path) as it:
+                    for entry in it:
+                        try:
+                            if not entry.is_dir():
+                                continue
+                        except OSError:
+                            continue
+                        entries.append((normalize_phrase(entry.name), depth + 1, entry.path))
+                        # Les dossiers cachés sont indexés mais pas explorés
+                        if depth + 1 < self.max_depth and not entry.name.startswith("."):
+                            queue.append((entry.path, depth + 1))
+            except OSError:
+                continue
+        entries.sort()
+        self._entries = entries
+        self._keys = [e[0] for e in entries]
+        self._mtimes = mtimes
+        self._checked_at = time.monotonic()
+        self.builds += 1
+
+    def _is_stale(self) -> bool:
+        for path, mtime_ns in self._mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def refresh(self, force: bool = False):
+        now = time.monotonic()
+        if force or not self._mtimes:
+            self._build()
+        elif now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            if self._is_stale():
+                self._build()
+
+    def _shallowest(self, candidates: List[Tuple[str, int, str]]) -> Optional[str]:
+        if not candidates:
+            return None
+        return min(candidates, key=lambda e: (e[1], len(e[0]), e[2]))[2]
+
+    def _resolve_alias(self, key: str) -> Optional[str]:
+        target = self.aliases.get(key)
+        if target is None:
+            return None
+        path = target if os.path.isabs(target) else os.path.join(self.base_path, target)
+        return path if os.path.isdir(path) else None
+
+    def lookup(self, name: str) -> Optional[str]:
+        """Chemin du dossier le plus proche de `name` (le moins profond en cas d'égalité)."""
+        key = normalize_phrase(name)
+        if not key:
+            return None
+        self.refresh()
+
+        # Nom exact
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_right(self._keys, key)
+        if lo < hi:
+            return self._shallowest(self._entries[lo:hi])
+
+        # Alias utilisateur ("bureau" -> Desktop)
+        alias = self._resolve_alias(key)
+        if alias:
+            return alias
+
+        # Préfixe
+        hi = bisect.bisect_left(self._keys, key + "\uffff")
+        if lo < hi:
+            return self._shallowest(self._entries[lo:hi])
+
+        # Sous-chaîne puis correspondance approximative
+        found = self._shallowest([e for e in self._entries if key in e[0]])
+        if found:
+            return found
+        close = difflib.get_close_matches(key, self._keys, n=1, cutoff=0.8)
+        if close:
+            lo = bisect.bisect_left(self._keys, close[0])
+            hi = bisect.bisect_right(self._keys, close[0])
+            return self._shallowest(self._entries[lo:hi])
+        return None
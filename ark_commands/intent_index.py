@@ -0,0 +1,170 @@
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np
+from ark_commands.encoders import Encoder
+from ark_commands.utterance import Utterance
+from ark_commands.embedding_cache import EmbeddingCache
+from ark_pipeline.tracing import TRACER
+
+# Familles d'intentions partagées par ARKResponses, ARKCommands et SubjectExtractor
+GROUP_SLEEP = "sleep"
+GROUP_RESPONSES = "responses"
+GROUP_COMMANDS = "commands"
+GROUP_SUBJECTS = "subjects"
+GROUP_ACTIONS = "actions"
+
+
+class IntentIndex:
+    """
+    Registre unique des phrases d'ancrage de toutes les familles d'intentions.
+
+    Chaque phrase est encodée une seule fois, normalisée, puis empilée dans une
+    matrice NumPy. Un tour coûte un produit matrice-vecteur suivi d'un max groupé
+    par (famille, étiquette), quel que soit le nombre d'intentions enregistrées.
+
+    Les embeddings sont stockés en `dtype` : float32 par défaut (scoring le plus
+    rapide) ou float16 pour diviser la mémoire par deux sur les très gros catalogues,
+    au prix d'un scoring par blocs de `SCORE_BLOCK` lignes converties en float32.
+    """
+
+    # Lignes converties à la fois en scoring float16 : mémoire temporaire bornée
+    SCORE_BLOCK = 4096
+
+    def __init__(self, model: Encoder, cache: Optional[EmbeddingCache] = None, dtype=np.float32):
+        self.model = model
+        self.cache = cache
+        self.dtype = np.dtype(dtype)
+        # famille -> étiquette -> embeddings normalisés (n, dim)
+        self._anchors: Dict[str, Dict[Hashable, np.ndarray]] = {}
+        # famille -> étiquette -> phrases encodées, pour ne réencoder que ce qui change
+        self._phrases: Dict[str, Dict[Hashable, Tuple[str, ...]]] = {}
+        self._matrix: Optional[np.ndarray] = None
+        self._segments: List[Tuple[str, Hashable]] = []
+        self._starts: Optional[np.ndarray] = None
+        self.version = 0
+
+    def _encode(self, phrases: Sequence[str]) -> np.ndarray:
+        if self.cache is not None:
+            embeddings = self.cache.encode(list(phrases))
+        else:
+            embeddings = np.asarray(self.model.encode(list(phrases), convert_to_numpy=True), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return (embeddings / np.maximum(norms, 1e-12)).astype(self.dtype)
+
+    def _invalidate(self):
+        self._matrix = None
+        self.version += 1
+
+    def set_group(self, group: str, anchors: Dict[Hashable, Sequence[str]]) -> bool:
+        """
+        Remplace toutes les étiquettes d'une famille. Seules les étiquettes nouvelles
+        ou dont les phrases ont changé sont encodées ; retourne False si rien ne change.
+        """
+        anchors = {label: tuple(phrases) for label, phrases in anchors.items() if phrases}
+        previous = self._phrases.get(group, {})
+        if group in self._anchors and anchors == previous and list(anchors) == list(previous):
+            return False
+
+        current = self._anchors.get(group, {})
+        changed = [label for label, phrases in anchors.items() if previous.get(label) != phrases]
+        # Un seul appel d'encodage pour les étiquettes modifiées, découpé ensuite par étiquette
+        flat = [phrase for label in changed for phrase in anchors[label]]
+        embeddings = self._encode(flat) if flat else None
+        encoded, offset = {}, 0
+        for label in changed:
+            encoded[label] = embeddings[offset:offset + len(anchors[label])]
+            offset += len(anchors[label])
+
+        self._anchors[group] = {label: encoded[label] if label in encoded else current[label]
+                                for label in anchors}
+        self._phrases[group] = anchors
+        self._invalidate()
+        return True
+
+    def set_label(self, group: str, label: Hashable, phrases: Sequence[str]):
+        """Ajoute ou remplace une seule étiquette : seules ses phrases sont encodées."""
+        phrases = tuple(phrases)
+        if self._phrases.get(group, {}).get(label) == phrases:
+            return
+        self._anchors.setdefault(group, {})[label] = self._encode(phrases)
+        self._phrases.setdefault(group, {})[label] = phrases
+        self._invalidate()
+
+    def remove_label(self, group: str, label: Hashable) -> bool:
+        if label not in self._anchors.get(group, {}):
+            return False
+        del self._anchors[group][label]
+        del self._phrases[group][label]
+        self._invalidate()
+        return True
+
+    def anchor_phrases(self) -> List[str]:
+        """Toutes les phrases d'ancrage actuellement indexées, toutes familles confondues."""
+        return [phrase for labels in self._phrases.values() for phrases in labels.values() for phrase in phrases]
+
+    def labels(self, group: str) -> List[Hashable]:
+        return list(self._anchors.get(group, {}))
+
+    def _build(self):
+        blocks, segments, starts = [], [], []
+        offset = 0
+        for group, labels in self._anchors.items():
+            for label, embeddings in labels.items():
+                segments.append((group, label))
+                starts.append(offset)
+                blocks.append(embeddings)
+                offset += len(embeddings)
+        self._segments = segments
+        self._starts = np.asarray(starts, dtype=np.intp)
+        self._matrix = np.vstack(blocks) if blocks else np.zeros((0, 0), dtype=self.dtype)
+        # Les étiquettes deviennent des vues de la matrice : une seule copie en mémoire
+        for (group, label), start in zip(segments, starts):
+            size = len(self._anchors[group][label])
+            self._anchors[group][label] = self._matrix[start:start + size]
+
+    def score(self, utterance: Utterance) -> Dict[str, Dict[Hashable, float]]:
+        """
+        Score de similarité cosinus maximal de chaque étiquette, groupé par famille.
+        Le résultat est mémorisé sur l'Utterance pour la version courante de l'index.
+        """
+        key = (id(self), self.version)
+        cached = utterance.cache.get(key)
+        if cached is not None:
+            return cached
+
+        embedding = utterance.embedding
+        with TRACER.span("scoring"):
+            scores = self._score(embedding)
+        utterance.cache[key] = scores
+        return scores
+
+    def _score(self, embedding: np.ndarray) -> Dict[str, Dict[Hashable, float]]:
+        if self._matrix is None:
+            self._build()
+
+        scores: Dict[str, Dict[Hashable, float]] = {group: {} for group in self._anchors}
+        if len(self._segments):
+            query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+            query = query / max(float(np.linalg.norm(query)), 1e-12)
+            sims = self._similarities(query)
+            maxima = np.maximum.reduceat(sims, self._starts)
+            for (group, label), value in zip(self._segments, maxima.tolist()):
+                scores[group][label] = value
+        return scores
+
+    def _similarities(self, query: np.ndarray) -> np.ndarray:
+        if self._matrix.dtype == np.float32:
+            return self._matrix @ query
+        # Stockage compact : conversion bloc par bloc plutôt qu'une copie float32 de toute la matrice
+        sims = np.empty(len(self._matrix), dtype=np.float32)
+        for start in range(0, len(self._matrix), self.SCORE_BLOCK):
+            block = self._matrix[start:start + self.SCORE_BLOCK]
+            sims[start:start + len(block)] = block.astype(np.float32) @ query
+        return sims
+
+    def best(self, utterance: Utterance, group: str) -> Tuple[Optional[Hashable], float]:
+        """Retourne (étiquette, score) la plus proche dans une famille, ou (None, 0.0)."""
+        group_scores = self.score(utterance).get(group)
+        if not group_scores:
+            return None, 0.0
+        label = max(group_scores, key=group_scores.get)
+        return label, group_scores[label]
@@ -0,0 +1,106 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from ark_commands.utils import normalize_phrase
+
+
+def tokenize(text: str) -> List[str]:
+    """Mots de la phrase normalisée (sans accents, apostrophes et tirets séparés)."""
+    return re.findall(r"\w+", normalize_phrase(text))
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def has_keyword(tokens: List[str], keywords: Iterable[str]) -> bool:
+    """Vrai si un mot commence par l'un des mots-clés ("photos" pour "photo", pas "revoir" pour "voir")."""
+    return any(token.startswith(keyword) for token in tokens for keyword in keywords)
+
+
+@dataclass(frozen=True)
+class LexicalMatch:
+    intent: str
+    label: Optional[str]
+    # 1.0 pour une correspondance exacte de mots, similarité de trigrammes sinon
+    score: float = 1.0
+
+
+class LexicalIndex:
+    """
+    Filtre lexical compilé pour les phrases courtes : index inversé mot -> expressions
+    et trigramme -> expressions. Une phrase n'est résolue que si une seule intention
+    correspond ; sinon la décision revient aux embeddings.
+    """
+
+    def __init__(self, max_tokens: int = 4, min_similarity: float = 0.7):
+        self.max_tokens = max_tokens
+        self.min_similarity = min_similarity
+        self._entries: List[Tuple[str, Optional[str], Tuple[str, ...]]] = []
+        self._by_token: Dict[str, List[int]] = defaultdict(list)
+        self._by_trigram: Dict[str, List[int]] = defaultdict(list)
+        self._trigrams: List[Set[str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, intent: str, label: Optional[str], expressions: Iterable[str]):
+        for expression in expressions:
+            tokens = tuple(tokenize(expression))
+            if not tokens:
+                continue
+            position = len(self._entries)
+            self._entries.append((intent, label, tokens))
+            self._by_token[tokens[0]].append(position)
+            grams = trigrams(" ".join(tokens))
+            self._trigrams.append(grams)
+            for gram in grams:
+                self._by_trigram[gram].append(position)
+
+    def remove(self, intent: str, label: Optional[str]):
+        kept = [(i, l, tokens) for i, l, tokens in self._entries if (i, l) != (intent, label)]
+        self.clear()
+        for i, l, tokens in kept:
+            self.add(i, l, [" ".join(tokens)])
+
+    def clear(self):
+        self._entries = []
+        self._by_token.clear()
+        self._by_trigram.clear()
+        self._trigrams = []
+
+    def match(self, text: str) -> Optional[LexicalMatch]:
+        tokens = tokenize(text)
+        if not tokens or len(tokens) > self.max_tokens:
+            return None
+
+        found = self._exact(tokens)
+        if found:
+            return LexicalMatch(*found.pop()) if len(found) == 1 else None
+        return self._similar(" ".join(tokens))
+
+    def _exact(self, tokens: List[str]) -> Set[Tuple[str, Optional[str]]]:
+        found = set()
+        for start, token in enumerate(tokens):
+            for position in self._by_token.get(token, ()):
+                intent, label, expression = self._entries[position]
+                if tuple(tokens[start:start + len(expression)]) == expression:
+                    found.add((intent, label))
+        return found
+
+    def _similar(self, text: str) -> Optional[LexicalMatch]:
+        grams = trigrams(text)
+        candidates = {position for gram in grams for position in self._by_trigram.get(gram, ())}
+        best: Dict[Tuple[str, Optional[str]], float] = {}
+        for position in candidates:
+            other = self._trigrams[position]
+            similarity = len(grams & other) / len(grams | other)
+            if similarity >= self.min_similarity:
+                intent, label, _ = self._entries[position]
+                best[(intent, label)] = max(similarity, best.get((intent, label), 0.0))
+        if len(best) != 1:
+            return None
+        (intent, label), similarity = best.popitem()
+        return LexicalMatch(intent, label, similarity)
@@ -1,10 +1,27 @@
 import os
 import re
-from typing import List, Optional, Tuple
+import heapq
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
-from sentence_transformers import SentenceTransformer, util
+from ark_commands.encoders import Encoder
 from ark_commands.utils import remove_accents
+from ark_commands.utterance import Utterance
+from ark_commands.intent_index import IntentIndex, GROUP_SUBJECTS, GROUP_ACTIONS
+from ark_commands.file_index import FileIndex, FolderSnapshot
+from ark_commands.tree_walker import TreeWalker, WalkResult, WalkStream, split_stream
+from ark_commands.folder_index import FolderNameIndex
+from ark_commands.lexical_index import tokenize, has_keyword
+from ark_commands.catalog import load_catalog
+from ark_pipeline.tracing import TRACER
+
+# Mots ignorés entre "dans" et le nom du dossier ("dans le dossier Images")
+LOCATION_STOPWORDS = {"le", "la", "les", "l", "mon", "ma", "mes", "du", "de", "des",
+                      "dossier", "repertoire", "sous-dossier"}
+
+# Mots introduisant l'emplacement : ce qui suit ne décrit pas le sujet
+LOCATION_KEYWORDS = ["dans", "sur"]
 
 class SubjectType(Enum):
     FILES = "fichiers"
@@ -25,86 +42,122 @@ class ExtractedSubject:
     count_requested: bool = False
     list_requested: bool = False
     confidence: float = 0.0
+    recursive: bool = False
+
+# Mots-clés partagés par le repli après scoring et par le filtre lexical (sans accents)
+SUBJECT_KEYWORDS = {
+    SubjectType.IMAGES: ["image", "photo", "jpg", "png"],
+    SubjectType.VIDEOS: ["video", "mp4", "film"],
+    SubjectType.DOCUMENTS: ["document", "pdf", "doc"],
+    SubjectType.FOLDERS: ["dossier", "folder"],
+    SubjectType.MUSIC: ["music", "mp3", "audio"]
+}
+COUNT_KEYWORDS = ["combien", "nombre", "compte"]
+LIST_KEYWORDS = ["liste", "affiche", "voir", "montre"]
+
+# Filtre lexical : une négation rend la demande ambiguë ("je ne veux pas voir les photos")
+NEGATION_WORDS = {"ne", "n", "pas", "jamais", "plus"}
+# Mots admis entre l'action et le sujet ("combien y a-t-il de", "montre-moi tous les")
+ACTION_LINK_WORDS = {"de", "d", "des", "les", "le", "la", "l", "mes", "mon", "ma", "tous", "toutes",
+                     "moi", "m", "y", "a", "t", "il"}
+GENERIC_SUBJECT_WORDS = ["fichier", "element"]
 
 class SubjectExtractor:
-    def __init__(self, model: SentenceTransformer, base_path: str = ""):
+    def __init__(self, model: Encoder, base_path: str = "", index: Optional[IntentIndex] = None,
+                 folder_depth: int = 2, folder_aliases: Optional[Dict[str, str]] = None,
+                 catalog: Optional[Dict[str, Any]] = None):
         self.model = model
+        self.index = index or IntentIndex(model)
         self.base_path = base_path or os.path.expanduser("~")
-        
+        self.folder_index = FolderNameIndex(self.base_path, max_depth=folder_depth, aliases=folder_aliases)
+        self.apply_catalog(catalog or load_catalog())
+
+    def apply_catalog(self, catalog: Dict[str, Any]):
+        """Exemples par type et par action, extensions par type : seuls les changements sont réencodés."""
+        subjects = {SubjectType(name): entry for name, entry in catalog["subjects"].items()}
         # Exemples pour chaque type (IA)
-        self.subject_examples = {
-            SubjectType.FILES: ["montrer les fichiers", "lister les éléments"],
-            SubjectType.FOLDERS: ["voir les dossiers", "lister les répertoires"],
-            SubjectType.IMAGES: ["montrer les photos", "images jpg png"],
-            SubjectType.VIDEOS: ["lister les vidéos mp4", "voir les films"],
-            SubjectType.DOCUMENTS: ["documents pdf", "fichiers texte"],
-            SubjectType.MUSIC: ["musique mp3", "fichiers audio"],
-            SubjectType.ARCHIVES: ["archives zip", "fichiers compressés"],
-            SubjectType.EXECUTABLES: ["programmes exe", "applications"],
-            SubjectType.TEXT_FILES: ["fichiers txt", "notes texte"]
-        }
-        
-        self.action_examples = {
-            'count': ["combien de", "nombre de", "compter"],
-            'list': ["lister", "montrer", "afficher"]
-        }
-        
+        self.subject_examples = {stype: list(entry.get("examples", [])) for stype, entry in subjects.items()}
+        self.action_examples = {action: list(phrases) for action, phrases in catalog["actions"].items()}
         # Extensions par type
-        self.type_extensions = {
-            SubjectType.IMAGES: ['.jpg', '.png', '.gif', '.webp'],
-            SubjectType.VIDEOS: ['.mp4', '.avi', '.mkv', '.mov'],
-            SubjectType.DOCUMENTS: ['.pdf', '.doc', '.docx', '.txt'],
-            SubjectType.MUSIC: ['.mp3', '.wav', '.flac'],
-            SubjectType.ARCHIVES: ['.zip', '.rar', '.7z'],
-            SubjectType.EXECUTABLES: ['.exe', '.app', '.deb'],
-            SubjectType.TEXT_FILES: ['.txt', '.md', '.log']
-        }
-        
+        self.type_extensions = {stype: list(entry["extensions"]) for stype, entry in subjects.items()
+                                if entry.get("extensions")}
+        # Extensions prononcées ("zip", "exe") -> types, pour le filtre lexical
+        self.extension_words: Dict[str, List[SubjectType]] = {}
+        for stype, extensions in self.type_extensions.items():
+            for ext in extensions:
+                self.extension_words.setdefault(ext.lower().lstrip("."), []).append(stype)
         # Pré-calcul des embeddings
         self._precompute_embeddings()
 
     def _precompute_embeddings(self):
-        self.subject_embeddings = {
-            stype: self.model.encode(examples) 
-            for stype, examples in self.subject_examples.items()
-        }
-        self.action_embeddings = {
-            action: self.model.encode(examples) 
-            for action, examples in self.action_examples.items()
-        }
-
-    def extract_subjects(self, phrase: str) -> List[ExtractedSubject]:
-        phrase_clean = remove_accents(phrase.lower())
-        user_emb = self.model.encode([phrase])
+        self.index.set_group(GROUP_SUBJECTS, self.subject_examples)
+        self.index.set_group(GROUP_ACTIONS, self.action_examples)
+
+    def extract_subjects(self, phrase: Union[str, Utterance]) -> List[ExtractedSubject]:
+        utterance = Utterance.coerce(phrase, self.model)
+        phrase_clean = remove_accents(utterance.text.lower())
+        scores = self.index.score(utterance)
         
         # Détection IA + fallback
-        subjects = self._detect_subjects_ai(user_emb, phrase_clean)
-        count_req, list_req = self._detect_actions_ai(user_emb, phrase_clean)
+        subjects = self._detect_subjects_ai(scores[GROUP_SUBJECTS], phrase_clean)
+        count_req, list_req = self._detect_actions_ai(scores[GROUP_ACTIONS], phrase_clean)
+        return self._build_subjects(phrase_clean, subjects, count_req, list_req)
+
+    def extract_subjects_lexical(self, phrase: Union[str, Utterance]) -> List[ExtractedSubject]:
+        """
+        Extraction par mots-clés seuls, sans le modèle. Retourne une liste vide si la
+        phrase n'est pas sans ambiguïté : une seule action (compter ou lister), sans
+        négation, suivie directement du type recherché ("combien de photos", "liste les
+        vidéos") et au moins un type nommé avant l'emplacement.
+        """
+        text = phrase.text if isinstance(phrase, Utterance) else phrase
+        phrase_clean = remove_accents(text.lower())
+        tokens = tokenize(phrase_clean)
+        count_req = has_keyword(tokens, COUNT_KEYWORDS)
+        list_req = has_keyword(tokens, LIST_KEYWORDS)
+        if count_req == list_req or NEGATION_WORDS.intersection(tokens):
+            return []
+        # "combien de temps pour les documents" : le mot qui suit l'action n'est pas un sujet
+        keywords = COUNT_KEYWORDS if count_req else LIST_KEYWORDS
+        action = next(i for i, token in enumerate(tokens) if has_keyword([token], keywords))
+        following = [token for token in tokens[action + 1:] if token not in ACTION_LINK_WORDS][:1]
+        subject_words = [word for words in SUBJECT_KEYWORDS.values() for word in words]
+        if not has_keyword(following, subject_words + GENERIC_SUBJECT_WORDS):
+            return []
+
+        # Le nom du dossier ("dans Images") ne désigne pas le type recherché
+        cut = next((i for i, token in enumerate(tokens) if token in LOCATION_KEYWORDS), len(tokens))
+        subject_tokens = tokens[:cut]
+        types = [stype for stype, words in SUBJECT_KEYWORDS.items() if has_keyword(subject_tokens, words)]
+        if not types and subject_tokens and has_keyword(subject_tokens[-1:], GENERIC_SUBJECT_WORDS):
+            # "combien de fichiers" seulement : un qualificatif ("fichiers texte") relève des embeddings
+            types = [SubjectType.FILES]
+        if not types:
+            return []
+        # Une extension d'un type non détecté ("images et fichiers exe") rend la phrase ambiguë
+        if any(token in self.extension_words and not set(self.extension_words[token]) & set(types)
+               for token in subject_tokens):
+            return []
+        return self._build_subjects(phrase_clean, [(stype, 1.0) for stype in types], count_req, list_req)
+
+    def _build_subjects(self, phrase_clean: str, subjects: List[Tuple[SubjectType, float]],
+                        count_req: bool, list_req: bool) -> List[ExtractedSubject]:
         location = self._extract_location(phrase_clean)
         filters = self._extract_filters(phrase_clean)
+        recursive = self._detect_recursive(phrase_clean)
         
         return [ExtractedSubject(
             subject_type=stype, location=location, filters=filters,
-            count_requested=count_req, list_requested=list_req, confidence=conf
+            count_requested=count_req, list_requested=list_req, confidence=conf,
+            recursive=recursive
         ) for stype, conf in subjects]
 
-    def _detect_subjects_ai(self, user_emb, phrase: str) -> List[Tuple[SubjectType, float]]:
-        results = []
-        for stype, embeddings in self.subject_embeddings.items():
-            sim = util.cos_sim(user_emb, embeddings)[0].max().item()
-            if sim > 0.3:
-                results.append((stype, sim))
+    def _detect_subjects_ai(self, subject_scores: Dict[SubjectType, float], phrase: str) -> List[Tuple[SubjectType, float]]:
+        results = [(stype, sim) for stype, sim in subject_scores.items() if sim > 0.3]
         
         # Fallback mots-clés si rien détecté
         if not results:
-            keywords = {
-                SubjectType.IMAGES: ["image", "photo", "jpg", "png"],
-                SubjectType.VIDEOS: ["video", "mp4", "film"],
-                SubjectType.DOCUMENTS: ["document", "pdf", "doc"],
-                SubjectType.FOLDERS: ["dossier", "folder"],
-                SubjectType.MUSIC: ["music", "mp3", "audio"]
-            }
-            for stype, words in keywords.items():
+            for stype, words in SUBJECT_KEYWORDS.items():
                 if any(w in phrase for w in words):
                     results.append((stype, 0.5))
             if not results:
@@ -112,24 +165,29 @@ class SubjectExtractor:
         
         return sorted(results, key=lambda x: x[1], reverse=True)
 
-    def _detect_actions_ai(self, user_emb, phrase: str) -> Tuple[bool, bool]:
-        count_sim = util.cos_sim(user_emb, self.action_embeddings['count'])[0].max().item()
-        list_sim = util.cos_sim(user_emb, self.action_embeddings['list'])[0].max().item()
+    def _detect_actions_ai(self, action_scores: Dict[str, float], phrase: str) -> Tuple[bool, bool]:
+        count_sim = action_scores.get('count', 0.0)
+        list_sim = action_scores.get('list', 0.0)
         
-        count_req = count_sim > 0.4 or any(w in phrase for w in ["combien", "nombre"])
-        list_req = list_sim > 0.4 or any(w in phrase for w in ["liste", "afficher", "voir"])
+        count_req = count_sim > 0.4 or any(w in phrase for w in COUNT_KEYWORDS)
+        list_req = list_sim > 0.4 or any(w in phrase for w in LIST_KEYWORDS)
         
         return count_req, list_req
 
+    def _detect_recursive(self, phrase: str) -> bool:
+        return any(w in phrase for w in ["sous-dossier", "sous dossier", "sous-repertoire",
+                                         "recursi", "partout", "arborescence"])
+
     def _extract_location(self, phrase: str) -> str:
         # Simple extraction par mots-clés
-        for keyword in ["dans", "dans le", "sur"]:
+        for keyword in LOCATION_KEYWORDS:
             if keyword in phrase:
                 parts = phrase.split(keyword, 1)
                 if len(parts) > 1:
                     remaining = parts[1].strip()
                     if remaining:  # Vérifier que la partie après le mot-clé n'est pas vide
-                        folder_name = remaining.split()[0] if remaining.split() else ""
+                        words = [w for w in re.split(r"[\s']+", remaining) if w and w not in LOCATION_STOPWORDS]
+                        folder_name = words[0] if words else ""
                         if folder_name:
                             folder_path = self._find_folder(folder_name)
                             if folder_path:
@@ -137,14 +195,7 @@ class SubjectExtractor:
         return self.base_path
 
     def _find_folder(self, folder_name: str) -> Optional[str]:
-        try:
-            for entry in os.listdir(self.base_path):
-                entry_path = os.path.join(self.base_path, entry)
-                if os.path.isdir(entry_path) and folder_name.lower() in entry.lower():
-                    return entry_path
-        except (PermissionError, FileNotFoundError):
-            pass
-        return None
+        return self.folder_index.lookup(folder_name)
 
     def _extract_filters(self, phrase: str) -> List[str]:
         # Extensions et noms entre guillemets
@@ -153,47 +204,177 @@ class SubjectExtractor:
         return filters
 
 
+@dataclass
+class SubjectScan:
+    count: int
+    entries: List[str]
+    # Vrai si le parcours récursif n'a pas tout couvert : `count` est alors un minimum
+    truncated: bool = False
+
+
 class SubjectOfCommands:
-    def __init__(self, model: SentenceTransformer, base_path: str = ""):
+    def __init__(self, model: Encoder, base_path: str = "", index: Optional[IntentIndex] = None,
+                 folder_depth: int = 2, folder_aliases: Optional[Dict[str, str]] = None,
+                 catalog: Optional[Dict[str, Any]] = None):
         self.base_path = base_path or os.path.expanduser("~")
-        self.extractor = SubjectExtractor(model, self.base_path)
+        self.extractor = SubjectExtractor(model, self.base_path, index=index, folder_depth=folder_depth,
+                                          folder_aliases=folder_aliases, catalog=catalog)
+        self.file_index = FileIndex(self.extractor.type_extensions)
+        self.walker = TreeWalker()
         self.subjects: List[ExtractedSubject] = []
 
-    def analyze_phrase(self, phrase: str) -> List[ExtractedSubject]:
+    def analyze_phrase(self, phrase: Union[str, Utterance]) -> List[ExtractedSubject]:
         self.subjects = self.extractor.extract_subjects(phrase)
         return self.subjects
 
+    def analyze_phrase_lexical(self, phrase: Union[str, Utterance]) -> List[ExtractedSubject]:
+        """Comme `analyze_phrase`, par mots-clés seuls ; liste vide si la phrase est ambiguë."""
+        subjects = self.extractor.extract_subjects_lexical(phrase)
+        if subjects:
+            self.subjects = subjects
+        return subjects
+
+    def apply_catalog(self, catalog: Dict[str, Any]):
+        self.extractor.apply_catalog(catalog)
+        self.file_index.set_type_extensions(self.extractor.type_extensions)
+
     def get_primary_subject(self) -> Optional[ExtractedSubject]:
         return max(self.subjects, key=lambda x: x.confidence) if self.subjects else None
 
-    def get_files_by_subject(self, subject: ExtractedSubject) -> List[str]:
-        try:
-            entries = os.listdir(subject.location)
-            filtered = []
-            
-            for entry in entries:
-                path = os.path.join(subject.location, entry)
-                
-                # Filtrage par type
-                if subject.subject_type == SubjectType.FOLDERS and not os.path.isdir(path):
-                    continue
-                if subject.subject_type != SubjectType.FOLDERS and not os.path.isfile(path):
-                    continue
-                
-                # Filtrage par extension
-                if (subject.subject_type in self.extractor.type_extensions and 
-                    os.path.splitext(entry)[1].lower() not in self.extractor.type_extensions[subject.subject_type]):
-                    continue
-                
-                # Filtres personnalisés
-                if subject.filters and not any(f.lower() in entry.lower() for f in subject.filters):
+    def _entries_for(self, snapshot: FolderSnapshot, subject_type: SubjectType) -> List[str]:
+        if subject_type == SubjectType.FOLDERS:
+            return snapshot.folders
+        if subject_type in self.extractor.type_extensions:
+            return snapshot.by_type.get(subject_type, [])
+        return snapshot.files
+
+    def _classifier(self, types: List[SubjectType], filters: List[str]) -> Callable[[str, bool], List[SubjectType]]:
+        """
+        Classe une entrée dans tous les types demandés en une seule consultation de
+        la table extension -> types (un ".txt" est à la fois DOCUMENTS et TEXT_FILES).
+        """
+        wanted = set(types)
+        want_folders = SubjectType.FOLDERS in wanted
+        # Types sans extensions connues (FILES) : tout fichier convient
+        catch_all = [t for t in types if t != SubjectType.FOLDERS and t not in self.extractor.type_extensions]
+        filters = [f.lower() for f in filters]
+        ext_to_types = self.file_index.ext_to_types
+
+        def classify(name: str, is_dir: bool) -> List[SubjectType]:
+            if filters and not any(f in name.lower() for f in filters):
+                return []
+            if is_dir:
+                return [SubjectType.FOLDERS] if want_folders else []
+            matched = [t for t in ext_to_types.get(os.path.splitext(name)[1].lower(), ()) if t in wanted]
+            return matched + catch_all if catch_all else matched
+
+        return classify
+
+    def _group_by_location(self, subjects: List[ExtractedSubject], recursive: bool) -> Dict[tuple, List[int]]:
+        """Regroupe les sujets qui partagent dossier, filtres et mode récursif."""
+        groups: Dict[tuple, List[int]] = {}
+        for i, subject in enumerate(subjects):
+            key = (subject.location, tuple(subject.filters), recursive or subject.recursive)
+            groups.setdefault(key, []).append(i)
+        return groups
+
+    def scan_subjects(self, subjects: List[ExtractedSubject], recursive: bool = False,
+                      limit: Optional[int] = None, count: bool = True) -> List[SubjectScan]:
+        """
+        Comptes et listes de plusieurs sujets en un seul parcours par dossier.
+        Le résultat est aligné sur `subjects`.
+        """
+        with TRACER.span("fs_scan"):
+            return self._scan_subjects(subjects, recursive, limit, count)
+
+    def _scan_subjects(self, subjects: List[ExtractedSubject], recursive: bool,
+                       limit: Optional[int], count: bool) -> List[SubjectScan]:
+        results: List[Optional[SubjectScan]] = [None] * len(subjects)
+        for (location, filters, rec), indices in self._group_by_location(subjects, recursive).items():
+            types = list(dict.fromkeys(subjects[i].subject_type for i in indices))
+
+            if rec:
+                walk = self.walker.walk(location, self._classifier(types, list(filters)),
+                                        keys=types, limit=limit, count=count)
+                for i in indices:
+                    stype = subjects[i].subject_type
+                    results[i] = SubjectScan(walk.counts.get(stype, 0), walk.entries.get(stype, []), walk.truncated)
+                continue
+
+            try:
+                snapshot = self.file_index.snapshot(location)
+            except (FileNotFoundError, PermissionError, NotADirectoryError):
+                snapshot = None
+            lowered = [f.lower() for f in filters]
+            for i in indices:
+                entries = self._entries_for(snapshot, subjects[i].subject_type) if snapshot else []
+                if limit == 0:
+                    # Simple comptage : longueur du compartiment, sans copier les noms
+                    total = sum(1 for e in entries if any(f in e.lower() for f in lowered)) if lowered else len(entries)
+                    results[i] = SubjectScan(total, [])
                     continue
-                
-                filtered.append(entry)
-            
-            return filtered
-        except (FileNotFoundError, PermissionError):
-            return []
+                if lowered:
+                    entries = [e for e in entries if any(f in e.lower() for f in lowered)]
+                results[i] = SubjectScan(len(entries), list(entries[:limit] if limit is not None else entries))
+        return results
+
+    def iter_subjects(self, subjects: List[ExtractedSubject], recursive: bool = False) -> List[Iterator[str]]:
+        """
+        Un itérateur paresseux par sujet, alimentés par une seule lecture de chaque
+        dossier. Aligné sur `subjects`.
+        """
+        streams: List[Iterator[str]] = [iter(())] * len(subjects)
+        for (location, filters, rec), indices in self._group_by_location(subjects, recursive).items():
+            types = list(dict.fromkeys(subjects[i].subject_type for i in indices))
+            classify = self._classifier(types, list(filters))
+
+            snapshot = None if rec else self.file_index.cached(location)
+            if snapshot is not None:
+                # Dossier déjà indexé et inchangé : lecture directe des compartiments
+                for i in indices:
+                    candidates = self._entries_for(snapshot, subjects[i].subject_type)
+                    is_dir = subjects[i].subject_type == SubjectType.FOLDERS
+                    streams[i] = self._filtered(candidates, classify, is_dir, bool(filters))
+                continue
+
+            if rec:
+                status = WalkResult()
+                by_type = split_stream(self.walker.iter_walk(location, classify, status), types)
+                for i in indices:
+                    streams[i] = WalkStream(by_type[subjects[i].subject_type], status)
+                continue
+
+            source = ((key, name) for name, is_dir in self.file_index.iter_scan(location)
+                      for key in classify(name, is_dir))
+            by_type = split_stream(source, types)
+            for i in indices:
+                streams[i] = by_type[subjects[i].subject_type]
+        return streams
+
+    @staticmethod
+    def _filtered(candidates: List[str], classify: Callable[[str, bool], List[SubjectType]],
+                  is_dir: bool, filtered: bool) -> Iterator[str]:
+        # Fonction dédiée : chaque flux garde ses propres valeurs (pas de liaison tardive)
+        return (name for name in candidates if not filtered or classify(name, is_dir))
+
+    def get_files_by_subject(self, subject: ExtractedSubject, recursive: bool = False,
+                             limit: Optional[int] = None) -> List[str]:
+        return self.scan_subjects([subject], recursive=recursive, limit=limit, count=not recursive)[0].entries
+
+    def iter_files_by_subject(self, subject: ExtractedSubject, recursive: bool = False,
+                              sort_key: Optional[Callable[[str], Any]] = None,
+                              limit: Optional[int] = None) -> Iterator[str]:
+        """
+        Itère sur les entrées correspondant au sujet sans matérialiser tout le dossier.
+        La lecture s'arrête dès que `limit` entrées ont été produites ; avec `sort_key`,
+        seules les `limit` plus petites sont conservées (tas borné).
+        """
+        entries = self.iter_subjects([subject], recursive=recursive)[0]
+        if sort_key is not None:
+            if limit is not None:
+                return iter(heapq.nsmallest(limit, entries, key=sort_key))
+            return iter(sorted(entries, key=sort_key))
+        return islice(entries, limit) if limit is not None else entries
 
-    def count_by_subject(self, subject: ExtractedSubject) -> int:
-        return len(self.get_files_by_subject(subject))
\ No newline at end of file
+    def count_by_subject(self, subject: ExtractedSubject, recursive: bool = False) -> int:
+        return self.scan_subjects([subject], recursive=recursive, limit=0)[0].count
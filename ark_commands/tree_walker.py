@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+# classify(nom, est_un_dossier) -> clés auxquelles l'entrée appartient
+Classifier = Callable[[str, bool], Iterable[Hashable]]
+
+
+@dataclass
+class WalkResult:
+    counts: Dict[Hashable, int] = field(default_factory=dict)
+    # Chemins relatifs à la racine, au plus `limit` par clé
+    entries: Dict[Hashable, List[str]] = field(default_factory=dict)
+    directories: int = 0
+    # Vrai si une partie de l'arborescence n'a pas été parcourue (profondeur,
+    # budget de temps, arrêt anticipé) : les comptes sont alors des minima.
+    truncated: bool = False
+
+
+class WalkStream:
+    """
+    Flux paresseux d'entrées issu d'un parcours, qui indique si ce parcours a été
+    tronqué (profondeur ou budget de temps) : la liste est alors incomplète.
+    """
+
+    def __init__(self, entries: Iterator[str], status: WalkResult):
+        self._entries = entries
+        self.status = status
+
+    def __iter__(self) -> "WalkStream":
+        return self
+
+    def __next__(self) -> str:
+        return next(self._entries)
+
+    @property
+    def truncated(self) -> bool:
+        return self.status.truncated
+
+
+@dataclass
+class _DirScan:
+    matches: List[Tuple[Hashable, str]]
+    subdirs: List[Tuple[str, str, Optional[Tuple[int, int]]]]
+    truncated: bool
+
+
+class TreeWalker:
+    """
+    Parcours récursif et parallèle d'une arborescence avec `os.scandir`.
+
+    Chaque dossier est lu par un thread du pool ; le thread appelant agrège les
+    résultats et planifie les sous-dossiers. Garde-fous : profondeur maximale,
+    budget de temps par dossier et global, protection contre les boucles de liens
+    symboliques, arrêt dès que les listes demandées sont remplies.
+    """
+
+    def __init__(self, max_workers: int = 8, max_depth: int = 16, dir_time_budget: float = 1.0,
+                 time_budget: Optional[float] = None, follow_symlinks: bool = False):
+        self.max_workers = max_workers
+        self.max_depth = max_depth
+        self.dir_time_budget = dir_time_budget
+        self.time_budget = time_budget
+        self.follow_symlinks = follow_symlinks
+
+    def _scan_dir(self, path: str, rel: str, classify: Classifier, stop: threading.Event) -> _DirScan:
+        scan = _DirScan(matches=[], subdirs=[], truncated=False)
+        deadline = time.monotonic() + self.dir_time_budget
+        try:
+            with os.scandir(path) as it:
+                for i, entry in enumerate(it):
+                    # Vérifier le budget toutes les 256 entrées pour rester bon marché
+                    if i & 0xFF == 0 and i and (stop.is_set() or time.monotonic() > deadline):
+                        scan.truncated = True
+                        break
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=self.follow_symlinks)
+                        if not is_dir and not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    name = entry.name if not rel else f"{rel}/{entry.name}"
+                    for key in classify(entry.name, is_dir):
+                        scan.matches.append((key, name))
+                    if is_dir:
+                        inode = None
+                        if self.follow_symlinks:
+                            try:
+                                st = entry.stat()
+                                inode = (st.st_dev, st.st_ino)
+                            except OSError:
+                                continue
+                        scan.subdirs.append((entry.path, name, inode))
+        except (FileNotFoundError, PermissionError, NotADirectoryError):
+            pass
+        return scan
+
+    def walk(self, root: str, classify: Classifier, keys: Sequence[Hashable],
+             limit: Optional[int] = None, count: bool = True) -> WalkResult:
+        """
+        Parcourt `root` et agrège par clé les entrées retenues par `classify`.
+
+        Args:
+            keys: clés attendues (permet l'arrêt anticipé des listes)
+            limit: nombre maximal d'entrées conservées par clé (0 : comptage seul)
+            count: si False, le parcours s'arrête dès que chaque clé a `limit` entrées
+        """
+        result = WalkResult(counts={k: 0 for k in keys}, entries={k: [] for k in keys})
+        stop = threading.Event()
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+        visited: Set[Tuple[int, int]] = set()
+        if self.follow_symlinks:
+            try:
+                st = os.stat(root)
+                visited.add((st.st_dev, st.st_ino))
+            except OSError:
+                return result
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ark-walk") as pool:
+            pending = {pool.submit(self._scan_dir, root, "", classify, stop): 0}
+            while pending:
+                done, _ = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if deadline is not None and time.monotonic() > deadline:
+                    stop.set()
+                for future in done:
+                    depth = pending.pop(future)
+                    if future.cancelled():
+                        continue
+                    scan = future.result()
+                    result.directories += 1
+                    result.truncated |= scan.truncated
+                    for key, name in scan.matches:
+                        result.counts[key] = result.counts.get(key, 0) + 1
+                        if limit == 0:
+                            continue
+                        bucket = result.entries.setdefault(key, [])
+                        if limit is None or len(bucket) < limit:
+                            bucket.append(name)
+
+                    if not count and limit is not None and all(
+                            len(result.entries.get(k, ())) >= limit for k in keys):
+                        stop.set()
+                    if stop.is_set():
+                        continue
+
+                    for path, rel, inode in scan.subdirs:
+                        if depth + 1 > self.max_depth:
+                            result.truncated = True
+                            break
+                        if inode is not None:
+                            if inode in visited:
+                                continue
+                            visited.add(inode)
+                        pending[pool.submit(self._scan_dir, path, rel, classify, stop)] = depth + 1
+
+                if stop.is_set() and pending:
+                    result.truncated = True
+                    for future in pending:
+                        future.cancel()
+        return result
+
+    def iter_walk(self, root: str, classify: Classifier,
+                  status: Optional[WalkResult] = None) -> Iterator[Tuple[Hashable, str]]:
+        """
+        Parcours récursif séquentiel et paresseux : produit (clé, chemin relatif) pour
+        chaque entrée retenue par `classify`, avec les mêmes garde-fous que `walk`.
+        Le parcours peut être interrompu puis repris là où il s'était arrêté : seul le
+        temps passé à lire un dossier compte dans son budget, pas les pauses entre deux
+        pages. `status.truncated` signale les entrées écartées par les garde-fous.
+        """
+        status = status if status is not None else WalkResult()
+        visited: Set[Tuple[int, int]] = set()
+        if self.follow_symlinks:
+            try:
+                st = os.stat(root)
+                visited.add((st.st_dev, st.st_ino))
+            except OSError:
+                return
+        stack = [(root, "", 0)]
+        while stack:
+            path, rel, depth = stack.pop()
+            status.directories += 1
+            spent = 0.0
+            resumed = time.monotonic()
+            subdirs = []
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if spent + time.monotonic() - resumed > self.dir_time_budget:
+                            status.truncated = True
+                            break
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=self.follow_symlinks)
+                            if not is_dir and not entry.is_file():
+                                continue
+                        except OSError:
+                            continue
+                        name = entry.name if not rel else f"{rel}/{entry.name}"
+                        keys = list(classify(entry.name, is_dir))
+                        if keys:
+                            # Le budget du dossier est suspendu pendant que l'appelant garde la main
+                            spent += time.monotonic() - resumed
+                            for key in keys:
+                                yield key, name
+                            resumed = time.monotonic()
+                        if is_dir and depth + 1 > self.max_depth:
+                            status.truncated = True
+                        elif is_dir:
+                            if self.follow_symlinks:
+                                try:
+                                    st = entry.stat()
+                                except OSError:
+                                    continue
+                                if (st.st_dev, st.st_ino) in visited:
+                                    continue
+                                visited.add((st.st_dev, st.st_ino))
+                            subdirs.append((entry.path, name, depth + 1))
+            except (FileNotFoundError, PermissionError, NotADirectoryError):
+                continue
+            # Ordre de lecture conservé : le premier sous-dossier est exploré en premier
+            stack.extend(reversed(subdirs))
+
+
+def split_stream(source: Iterator[Tuple[Hashable, str]], keys: Sequence[Hashable]) -> Dict[Hashable, Iterator[str]]:
+    """
+    Répartit un flux (clé, entrée) en un itérateur paresseux par clé. Le flux source
+    n'est lu qu'une fois : les entrées destinées aux autres clés sont mises en attente
+    dans leur tampon jusqu'à ce qu'on les demande.
+    """
+    buffers: Dict[Hashable, Deque[str]] = {key: deque() for key in keys}
+
+    def stream(key: Hashable) -> Iterator[str]:
+        buffer = buffers[key]
+        while True:
+            if buffer:
+                yield buffer.popleft()
+                continue
+            try:
+                other, name = next(source)
+            except StopIteration:
+                return
+            if other == key:
+                yield name
+            elif other in buffers:
+                buffers[other].append(name)
+
+    return {key: stream(key) for key in buffers}
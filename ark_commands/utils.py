@@ -3,4 +3,8 @@ def remove_accents(text: str) -> str:
     return ''.join(
         c for c in unicodedata.normalize('NFD', text)
         if unicodedata.category(c) != 'Mn'
-    )
\ No newline at end of file
+    )
+
+def normalize_phrase(text: str) -> str:
+    """Minuscules, sans accents et espaces compactés : forme canonique d'une phrase."""
+    return ' '.join(remove_accents(text.lower()).split())
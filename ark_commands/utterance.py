@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+import numpy as np
+from ark_commands.encoders import Encoder
+from ark_pipeline.tracing import TRACER
+from ark_commands.utils import normalize_phrase
+
+class Utterance:
+    """
+    Contexte d'une phrase utilisateur partagé par tout le pipeline de dispatch.
+
+    L'embedding est calculé au premier accès puis réutilisé, de sorte qu'un tour
+    complet (veille, sujets, commandes, réponses) ne coûte qu'un seul passage du modèle.
+    """
+
+    def __init__(self, text: str, model: Optional[Encoder] = None,
+                 embedding: Optional[np.ndarray] = None):
+        self.text = text
+        self.normalized = normalize_phrase(text)
+        self._model = model
+        self._embedding = embedding
+        # Résultats dérivés de l'embedding (scores d'intentions...), mémorisés par tour
+        self.cache: Dict[Any, Any] = {}
+
+    @property
+    def embedding(self) -> np.ndarray:
+        """Embedding de la phrase, de forme (1, dim)."""
+        if self._embedding is None:
+            if self._model is None:
+                raise ValueError("Aucun modèle disponible pour encoder la phrase")
+            with TRACER.span("encode"):
+                self._embedding = self._model.encode([self.text], convert_to_numpy=True)
+        return self._embedding
+
+    @property
+    def is_encoded(self) -> bool:
+        return self._embedding is not None
+
+    @classmethod
+    def coerce(cls, phrase: Union[str, "Utterance"], model: Encoder) -> "Utterance":
+        """Retourne `phrase` telle quelle si c'est déjà un Utterance, sinon l'enveloppe."""
+        if isinstance(phrase, Utterance):
+            return phrase
+        return cls(phrase, model)
+
+    def __repr__(self) -> str:
+        return f"Utterance({self.text!r})"
+
+
+class UtteranceCache:
+    """
+    Cache LRU borné, indexé par la phrase normalisée (minuscules, sans accents).
+
+    Mémorise l'embedding de la phrase et l'intention résolue. Les intentions sont
+    étiquetées avec la version de l'index d'intentions : toute modification des
+    phrases d'ancrage (add_response, remove_response, set_sleep_trigger...) les
+    invalide automatiquement, les embeddings restant valables.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        # clé -> {"embedding": ndarray, "intent": (version, intention)}
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.intent_hits = 0
+        self.intent_misses = 0
+
+    def _entry(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str) -> Dict[str, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = {}
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def get_embedding(self, key: str) -> Optional[np.ndarray]:
+        entry = self._entry(key)
+        embedding = entry.get("embedding") if entry else None
+        if embedding is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return embedding
+
+    def put_embedding(self, key: str, embedding: np.ndarray):
+        if self.maxsize > 0:
+            self._store(key)["embedding"] = embedding
+
+    def get_intent(self, key: str, version: int) -> Optional[Any]:
+        entry = self._entry(key)
+        cached = entry.get("intent") if entry else None
+        if cached is None or cached[0] != version:
+            self.intent_misses += 1
+            return None
+        self.intent_hits += 1
+        return cached[1]
+
+    def put_intent(self, key: str, version: int, intent: Any):
+        if self.maxsize > 0:
+            self._store(key)["intent"] = (version, intent)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "intent_hits": self.intent_hits,
+            "intent_misses": self.intent_misses,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
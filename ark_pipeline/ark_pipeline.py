@@ -0,0 +1,222 @@
+from collections import Counter
+from dataclasses import dataclass
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from ark_commands.encoders import Encoder
+from ark_commands.ark_commands import ARKCommands, DEFAULT_SESSION
+from ark_commands.utterance import Utterance, UtteranceCache
+from ark_commands.catalog import CatalogWatcher
+from ark_commands.intent_index import GROUP_COMMANDS, GROUP_RESPONSES, GROUP_SLEEP
+from ark_responses.ark_responses import ARKResponses
+from ark_pipeline.tracing import TRACER
+
+INTENT_SLEEP = "sleep"
+INTENT_COMMAND = "command"
+INTENT_RESPONSE = "response"
+
+SLEEP_REPLY = "À bientôt !"
+
+# Chemin de décision d'un tour
+PATH_LEXICAL = "lexical"
+PATH_CACHE = "cache"
+PATH_EMBEDDING = "embedding"
+
+@dataclass
+class TurnResult:
+    phrase: str
+    intent: str
+    reply: str
+    cached: bool = False
+    # Meilleure étiquette et score par famille (mode lot, pour calibrer les seuils)
+    scores: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_sleep(self) -> bool:
+        return self.intent == INTENT_SLEEP
+
+
+class ARKPipeline:
+    """Dispatch d'un tour : mise en veille, puis commandes, puis réponses prédéfinies."""
+
+    def __init__(self, model: Encoder, ark_responses: ARKResponses,
+                 commands: ARKCommands, cache: Optional[UtteranceCache] = None,
+                 catalog: Optional[CatalogWatcher] = None):
+        self.model = model
+        self.ark_responses = ark_responses
+        self.commands = commands
+        self.cache = cache if cache is not None else UtteranceCache()
+        self.catalog = catalog
+        # Embedding de la dernière hypothèse partielle : un seul emplacement, hors LRU
+        self._prefetched: Optional[Tuple[str, np.ndarray]] = None
+        # Nombre de tours résolus par chaque chemin (lexical, cache, embeddings)
+        self.paths: Counter = Counter()
+
+    def _anchors_version(self) -> Tuple[int, int]:
+        return self.ark_responses.index.version, self.commands.index.version
+
+    def make_utterance(self, phrase: str) -> Utterance:
+        """Construit le contexte de la phrase en réutilisant un embedding mémorisé."""
+        utterance = Utterance(phrase, self.model)
+        if self._prefetched is not None and self._prefetched[0] == utterance.normalized:
+            return Utterance(phrase, self.model, embedding=self._prefetched[1])
+        embedding = self.cache.get_embedding(utterance.normalized)
+        if embedding is not None:
+            utterance = Utterance(phrase, self.model, embedding=embedding)
+        return utterance
+
+    def prefetch(self, phrase: str, session: str = DEFAULT_SESSION):
+        """
+        Encode à l'avance une hypothèse partielle : si la phrase finale est identique
+        (une fois normalisée), son embedding est réutilisé. Seule la dernière hypothèse
+        est gardée, pour ne pas évincer du cache les phrases réellement répétées.
+        """
+        utterance = self.make_utterance(phrase)
+        if utterance.is_encoded or self._match_lexical(utterance, session) is not None:
+            return
+        self._prefetched = (utterance.normalized, utterance.embedding)
+
+    def encode_batch(self, phrases: List[str], with_scores: bool = False,
+                     sessions: Optional[List[str]] = None) -> List[Utterance]:
+        """
+        Construit les contextes d'un lot de phrases avec un seul appel à `encode`
+        pour toutes celles absentes du cache (doublons encodés une fois). Sans
+        `with_scores`, les phrases résolues par le filtre lexical ne sont pas encodées ;
+        `sessions` donne la session de chaque phrase ("la suite" dépend de sa pagination).
+        """
+        utterances = [self.make_utterance(phrase) for phrase in phrases]
+        sessions = sessions or [DEFAULT_SESSION] * len(utterances)
+        missing: Dict[str, str] = {}
+        for utterance, session in zip(utterances, sessions):
+            # Les phrases évidentes seront résolues sans embedding (encodage paresseux sinon),
+            # sauf si les scores sont demandés : ils exigent l'embedding de chaque phrase
+            if not utterance.is_encoded and (with_scores or self._match_lexical(utterance, session) is None):
+                missing.setdefault(utterance.normalized, utterance.text)
+        if not missing:
+            return utterances
+
+        with TRACER.span("encode_batch"):
+            embeddings = np.asarray(self.model.encode(list(missing.values()), convert_to_numpy=True))
+        by_key = {key: embedding[None, :] for key, embedding in zip(missing, embeddings)}
+        return [Utterance(u.text, self.model, embedding=by_key[u.normalized]) if u.normalized in by_key else u
+                for u in utterances]
+
+    def best_scores(self, utterance: Utterance) -> Dict[str, Any]:
+        scores = {}
+        for name, index, group in (("sleep", self.ark_responses.index, GROUP_SLEEP),
+                                   ("response", self.ark_responses.index, GROUP_RESPONSES),
+                                   ("command", self.commands.index, GROUP_COMMANDS)):
+            label, score = index.best(utterance, group)
+            scores[name] = {"label": label, "score": round(score, 4)}
+        return scores
+
+    def process_batch(self, phrases: Iterable[str], batch_size: int = 256,
+                      with_scores: bool = False) -> Iterator[TurnResult]:
+        """
+        Traite un flux de phrases par lots : un appel à `encode` par lot, puis le même
+        dispatch qu'en mode vocal, phrase par phrase et dans l'ordre.
+        """
+        phrases = iter(phrases)
+        while True:
+            chunk = list(islice(phrases, batch_size))
+            if not chunk:
+                return
+            for utterance in self.encode_batch(chunk, with_scores):
+                result = self.process(utterance)
+                if with_scores:
+                    result.scores = self.best_scores(utterance)
+                yield result
+
+    def process(self, phrase: Union[str, Utterance], session: str = DEFAULT_SESSION) -> TurnResult:
+        """Traite un tour ; `session` isole l'état de pagination ("la suite") par interface."""
+        with TRACER.turn(phrase if isinstance(phrase, str) else phrase.text):
+            result, path = self._process(phrase, session)
+            self.paths[path] += 1
+            TRACER.annotate(intent=result.intent, cached=result.cached, path=path)
+        return result
+
+    def path_stats(self) -> Dict[str, int]:
+        return {path: self.paths[path] for path in (PATH_LEXICAL, PATH_CACHE, PATH_EMBEDDING)}
+
+    def _process(self, phrase: Union[str, Utterance], session: str) -> Tuple[TurnResult, str]:
+        if self.catalog is not None:
+            # Rechargement à chaud : seules les entrées modifiées sont réencodées
+            self.catalog.refresh()
+        utterance = phrase if isinstance(phrase, Utterance) else self.make_utterance(phrase)
+
+        # Filtre lexical : aucune intervention du modèle pour les phrases évidentes
+        result = self._resolve_lexical(utterance, session)
+        if result is not None:
+            return result, PATH_LEXICAL
+
+        version = self._anchors_version()
+        path = PATH_CACHE
+        intent = self.cache.get_intent(utterance.normalized, version)
+        result = self._replay(utterance, intent, session) if intent is not None else None
+        if result is None:
+            path = PATH_EMBEDDING
+            result, intent = self._resolve(utterance, session)
+            self.cache.put_intent(utterance.normalized, version, intent)
+
+        if utterance.is_encoded:
+            self.cache.put_embedding(utterance.normalized, utterance.embedding)
+        return result, path
+
+    def _match_lexical(self, utterance: Utterance, session: str) -> Optional[Tuple[str, Any]]:
+        """Intention décidée par les seuls mots, si une seule famille correspond."""
+        with TRACER.span("lexical"):
+            response = self.ark_responses.match_lexical(utterance)
+            command = self.commands.match_lexical(utterance, session)
+        if response is not None and command is not None:
+            # Ambigu ("merci, combien d'images ?") : les embeddings départagent
+            return None
+        if command is not None:
+            return INTENT_COMMAND, command
+        if response is not None:
+            return (INTENT_SLEEP if response.intent == GROUP_SLEEP else INTENT_RESPONSE), response.label
+        return None
+
+    def _resolve_lexical(self, utterance: Utterance, session: str) -> Optional[TurnResult]:
+        match = self._match_lexical(utterance, session)
+        if match is None:
+            return None
+        kind, detail = match
+        if kind == INTENT_SLEEP:
+            return TurnResult(utterance.text, INTENT_SLEEP, SLEEP_REPLY)
+        if kind == INTENT_RESPONSE:
+            return TurnResult(utterance.text, INTENT_RESPONSE, self.ark_responses.responses[detail])
+        result = self.commands.run_lexical(*detail, session=session)
+        if result is None:
+            return None
+        return TurnResult(utterance.text, INTENT_COMMAND, result)
+
+    def _resolve(self, utterance: Utterance, session: str) -> Tuple[TurnResult, Tuple[str, Optional[str]]]:
+        # Vérification mise en veille
+        if self.ark_responses.is_sleep_command(utterance):
+            return TurnResult(utterance.text, INTENT_SLEEP, SLEEP_REPLY), (INTENT_SLEEP, None)
+
+        # Détection des commandes
+        result = self.commands.get_best_command(utterance, session=session)
+        if result is not None:
+            return TurnResult(utterance.text, INTENT_COMMAND, result), (INTENT_COMMAND, None)
+
+        # Utiliser les réponses prédéfinies
+        trigger = self.ark_responses.match_response(utterance)
+        reply = self.ark_responses.responses[trigger] if trigger is not None else self.ark_responses.unknown_response
+        return TurnResult(utterance.text, INTENT_RESPONSE, reply), (INTENT_RESPONSE, trigger)
+
+    def _replay(self, utterance: Utterance, intent: Tuple[str, Optional[str]],
+                session: str) -> Optional[TurnResult]:
+        """Rejoue une intention mémorisée sans repasser par le scoring."""
+        kind, label = intent
+        if kind == INTENT_SLEEP:
+            return TurnResult(utterance.text, INTENT_SLEEP, SLEEP_REPLY, cached=True)
+        if kind == INTENT_RESPONSE:
+            reply = self.ark_responses.responses.get(label, self.ark_responses.unknown_response) \
+                if label is not None else self.ark_responses.unknown_response
+            return TurnResult(utterance.text, INTENT_RESPONSE, reply, cached=True)
+        # Le résultat d'une commande dépend du système de fichiers : on la réexécute
+        result = self.commands.get_best_command(utterance, session=session)
+        if result is None:
+            return None
+        return TurnResult(utterance.text, INTENT_COMMAND, result, cached=True)
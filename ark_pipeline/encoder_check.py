@@ -0,0 +1,75 @@
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, List, Sequence, Tuple
+import numpy as np
+from ark_commands.ark_commands import ARKCommands
+from ark_commands.encoders import Encoder
+from ark_commands.intent_index import IntentIndex
+from ark_commands.utterance import Utterance
+from ark_responses.ark_responses import ARKResponses
+
+# Phrases de référence couvrant chaque famille d'intentions
+REFERENCE_PHRASES = [
+    "bonjour comment ça va",
+    "salut ARK",
+    "merci beaucoup",
+    "comment tu t'appelles",
+    "au revoir",
+    "va te reposer",
+    "combien de photos dans Images",
+    "compte les vidéos du dossier Vidéos",
+    "quel est le nombre de documents pdf",
+    "liste les fichiers du bureau",
+    "montre-moi les musiques mp3",
+    "affiche les archives zip dans Téléchargements",
+    "voir les dossiers",
+    "combien de fichiers texte dans Documents",
+    "quelle heure est-il",
+]
+
+
+@dataclass
+class EncoderAgreement:
+    decisions: int = 0
+    # (phrase, famille, étiquette de référence, étiquette du candidat)
+    mismatches: List[Tuple[str, str, Hashable, Hashable]] = field(default_factory=list)
+    max_score_delta: float = 0.0
+
+    @property
+    def agreement(self) -> float:
+        return 1.0 - len(self.mismatches) / self.decisions if self.decisions else 1.0
+
+    def within(self, tolerance: float) -> bool:
+        return not self.mismatches and self.max_score_delta <= tolerance
+
+
+def intent_scores(encoder: Encoder, phrases: Sequence[str]) -> List[Dict[str, Dict[Hashable, float]]]:
+    """Scores de toutes les familles d'intentions pour chaque phrase, en un seul lot."""
+    index = IntentIndex(encoder)
+    ARKResponses(encoder, index=index)
+    ARKCommands(encoder, index=index)
+    embeddings = np.asarray(encoder.encode(list(phrases), convert_to_numpy=True))
+    return [index.score(Utterance(phrase, encoder, embedding=embedding[None, :]))
+            for phrase, embedding in zip(phrases, embeddings)]
+
+
+def compare_encoders(reference: Encoder, candidate: Encoder, phrases: Sequence[str] = REFERENCE_PHRASES,
+                     tolerance: float = 0.05) -> EncoderAgreement:
+    """
+    Compare les décisions d'intention d'un encodeur candidat (int8, ONNX...) à celles
+    de l'encodeur de référence. Une décision diverge si le candidat choisit une autre
+    étiquette alors que celle de référence n'est pas à `tolerance` près de son meilleur score.
+    """
+    report = EncoderAgreement()
+    for phrase, ref, cand in zip(phrases, intent_scores(reference, phrases), intent_scores(candidate, phrases)):
+        for group, ref_scores in ref.items():
+            cand_scores = cand.get(group, {})
+            if not ref_scores or not cand_scores:
+                continue
+            report.decisions += 1
+            ref_label = max(ref_scores, key=ref_scores.get)
+            cand_label = max(cand_scores, key=cand_scores.get)
+            if cand_label != ref_label and cand_scores[cand_label] - cand_scores.get(ref_label, 0.0) > tolerance:
+                report.mismatches.append((phrase, group, ref_label, cand_label))
+            delta = max(abs(ref_scores[label] - cand_scores.get(label, 0.0)) for label in ref_scores)
+            report.max_score_delta = max(report.max_score_delta, delta)
+    return report
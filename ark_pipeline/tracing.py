@@ -0,0 +1,164 @@
+import json
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, TextIO
+
+class _NullSpan:
+    """Contexte vide partagé : coût quasi nul quand le traçage est désactivé."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Histogram:
+    """Dernières durées d'une étape (fenêtre glissante) et leurs percentiles."""
+
+    def __init__(self, window: int = 10000):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, p: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(50) * 1000,
+            "p95_ms": self.percentile(95) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+        }
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer: "Tracer", name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Tracer:
+    """
+    Instrumentation des étapes chaudes d'ARK : capture audio, reconnaissance,
+    encodage, scoring, parcours disque, formatage des réponses.
+
+    Les durées alimentent un histogramme par étape (p50/p95/p99). Pendant un tour
+    (`turn`), elles sont aussi cumulées par étape et, si un fichier est configuré,
+    écrites en une ligne JSON par tour.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._trace_file: Optional[TextIO] = None
+
+    def enable(self, trace_path: Optional[str] = None):
+        self.enabled = True
+        if trace_path:
+            self._trace_file = open(trace_path, "a", encoding="utf-8")
+
+    def disable(self):
+        self.enabled = False
+        if self._trace_file is not None:
+            self._trace_file.close()
+            self._trace_file = None
+
+    def span(self, name: str):
+        """Mesure le bloc `with` sous le nom d'étape `name`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(seconds)
+        turn = getattr(self._local, "turn", None)
+        if turn is not None:
+            stages = turn["stages_ms"]
+            stages[name] = stages.get(name, 0.0) + seconds * 1000
+
+    def annotate(self, **fields: Any):
+        """Ajoute des champs à la trace du tour en cours sur ce thread."""
+        turn = getattr(self._local, "turn", None)
+        if turn is not None:
+            turn.update(fields)
+
+    def turn(self, phrase: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Turn(self, phrase)
+
+    def _write(self, turn: Dict[str, Any]):
+        if self._trace_file is None:
+            return
+        line = json.dumps(turn, ensure_ascii=False)
+        with self._lock:
+            self._trace_file.write(line + "\n")
+            self._trace_file.flush()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def report(self) -> str:
+        lines = [f"{'étape':<14}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+        for name, s in self.summary().items():
+            lines.append(f"{name:<14}{s['count']:>7}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}")
+        return "\n".join(lines)
+
+
+class _Turn:
+    def __init__(self, tracer: Tracer, phrase: str):
+        self.tracer = tracer
+        self.data: Dict[str, Any] = {"phrase": phrase, "stages_ms": {}}
+
+    def __enter__(self):
+        self.data["ts"] = time.time()
+        self.start = time.perf_counter()
+        self.tracer._local.turn = self.data
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer._local.turn = None
+        elapsed = time.perf_counter() - self.start
+        self.data["total_ms"] = elapsed * 1000
+        self.tracer.record("turn", elapsed)
+        self.tracer._write(self.data)
+        return False
+
+
+# Traceur global, désactivé par défaut
+TRACER = Tracer()
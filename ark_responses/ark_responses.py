@@ -1,79 +1,133 @@
-from sentence_transformers import SentenceTransformer, util
+from typing import Any, Dict, Iterable, Optional, Union
+from ark_commands.encoders import Encoder
+from ark_commands.utterance import Utterance
+from ark_commands.intent_index import IntentIndex, GROUP_RESPONSES, GROUP_SLEEP
+from ark_commands.lexical_index import LexicalIndex, LexicalMatch
+from ark_commands.catalog import load_catalog
 
 class ARKResponses:
     """Gère les réponses prédéfinies et la détection des commandes de mise en veille d'ARK."""
     
-    def __init__(self, model: SentenceTransformer):
+    def __init__(self, model: Encoder, index: Optional[IntentIndex] = None,
+                 catalog: Optional[Dict[str, Any]] = None):
         self.model = model
+        self.index = index or IntentIndex(model)
+        self.lexicon = LexicalIndex()
+        self.apply_catalog(catalog or load_catalog())
+
+    def apply_catalog(self, catalog: Dict[str, Any]):
+        """
+        Charge réponses, déclencheur de veille et mots-clés depuis le catalogue.
+        Seuls les déclencheurs nouveaux ou modifiés sont réencodés.
         
+        Args:
+            catalog (dict): Catalogue d'intentions (voir ark_commands/catalog.json)
+        """
         # Réponses prédéfinies pour les conversations basiques
-        self.responses = {
-            "dire bonjour ou demander comment ça va": "Salut ! Ça va bien, merci ! Et toi ?",
-            "remercier poliment": "Avec plaisir !",
-            "demander le nom de l'assistant": "Je suis ton petit assistant vocal ARK, j'existe pour t'aider dans tes tâches du quotidien."
-        }
+        self.responses = {trigger: entry["reply"] for trigger, entry in catalog["responses"].items()}
         
         # Phrase déclencheur pour la mise en veille
-        self.sleep_trigger = "dire au revoir ou demander à ARK de se mettre en veille ou bien de se reposer ou de sleep"
-        self.unknown_response = "Désolé, je n'ai pas compris. Peux-tu reformuler ?"
+        self.sleep_trigger = catalog["sleep"]["trigger"]
+        self.unknown_response = catalog["unknown_response"]
+
+        # Expressions sans ambiguïté, reconnues sans passer par le modèle
+        self.keywords = {trigger: list(entry.get("keywords", [])) for trigger, entry in catalog["responses"].items()}
+        self.sleep_keywords = list(catalog["sleep"].get("keywords", []))
         
         # Pré-calculer les embeddings pour optimiser les performances
         self._precompute_embeddings()
+        self._compile_lexicon()
     
     def _precompute_embeddings(self):
-        """Pré-calcule les embeddings pour éviter de les recalculer à chaque requête."""
-        self.response_texts = list(self.responses.keys())
-        self.response_embeddings = self.model.encode(self.response_texts, convert_to_numpy=True)
-        self.sleep_embedding = self.model.encode([self.sleep_trigger], convert_to_numpy=True)
+        """Enregistre les phrases déclencheurs dans l'index d'intentions partagé."""
+        self.index.set_group(GROUP_RESPONSES, {trigger: [trigger] for trigger in self.responses})
+        self.index.set_group(GROUP_SLEEP, {GROUP_SLEEP: [self.sleep_trigger]})
+
+    def _compile_lexicon(self):
+        """Indexe les déclencheurs et leurs mots-clés pour le filtre lexical."""
+        self.lexicon.clear()
+        for trigger in self.responses:
+            self.lexicon.add(GROUP_RESPONSES, trigger, [trigger, *self.keywords.get(trigger, [])])
+        self.lexicon.add(GROUP_SLEEP, None, self.sleep_keywords)
+
+    def match_lexical(self, user_text: Union[str, Utterance]) -> Optional[LexicalMatch]:
+        """
+        Résout une phrase courte sans ambiguïté par ses seuls mots ("merci", "au revoir").
+        
+        Returns:
+            Optional[LexicalMatch]: intention GROUP_SLEEP ou GROUP_RESPONSES (avec le
+            déclencheur), ou None si la phrase doit être départagée par les embeddings
+        """
+        text = user_text.text if isinstance(user_text, Utterance) else user_text
+        return self.lexicon.match(text)
     
-    def get_best_response(self, user_text: str, threshold: float = 0.6) -> str:
+    def get_best_response(self, user_text: Union[str, Utterance], threshold: float = 0.6) -> str:
         """
         Trouve la réponse prédéfinie la plus proche sémantiquement du texte utilisateur.
         Retourne une réponse "inconnue" si la similarité est trop faible.
         
         Args:
-            user_text (str): Le texte de l'utilisateur à analyser
+            user_text (str | Utterance): Le texte de l'utilisateur ou son contexte déjà encodé
             threshold (float): Seuil minimum de similarité (0.0 à 1.0)
             
         Returns:
             str: La réponse la plus appropriée ou unknown_response
         """
-        user_embedding = self.model.encode([user_text], convert_to_numpy=True)
-        scores = util.cos_sim(user_embedding, self.response_embeddings)[0]
-        best_idx = scores.argmax()
-        best_score = float(scores[best_idx])
+        best_trigger = self.match_response(user_text, threshold)
 
-        if best_score >= threshold:
-            return self.responses[self.response_texts[best_idx]]
+        if best_trigger is not None:
+            return self.responses[best_trigger]
         else:
             return self.unknown_response
+
+    def match_response(self, user_text: Union[str, Utterance], threshold: float = 0.6) -> Optional[str]:
+        """
+        Trouve la phrase déclencheur la plus proche du texte utilisateur.
+        
+        Args:
+            user_text (str | Utterance): Le texte de l'utilisateur ou son contexte déjà encodé
+            threshold (float): Seuil minimum de similarité (0.0 à 1.0)
+            
+        Returns:
+            Optional[str]: Le déclencheur retenu, ou None si la similarité est trop faible
+        """
+        utterance = Utterance.coerce(user_text, self.model)
+        best_trigger, best_score = self.index.best(utterance, GROUP_RESPONSES)
+        if best_trigger is not None and best_score >= threshold:
+            return best_trigger
+        return None
     
-    def is_sleep_command(self, user_text: str, threshold: float = 0.6) -> bool:
+    def is_sleep_command(self, user_text: Union[str, Utterance], threshold: float = 0.6) -> bool:
         """
         Vérifie si la phrase utilisateur demande la mise en veille d'ARK.
         
         Args:
-            user_text (str): Le texte de l'utilisateur à analyser
+            user_text (str | Utterance): Le texte de l'utilisateur ou son contexte déjà encodé
             threshold (float): Seuil de similarité (0.0 à 1.0)
             
         Returns:
             bool: True si c'est une commande de mise en veille, False sinon
         """
-        user_embedding = self.model.encode([user_text], convert_to_numpy=True)
-        score = util.cos_sim(user_embedding, self.sleep_embedding)[0][0]
-        return float(score) >= threshold
+        utterance = Utterance.coerce(user_text, self.model)
+        _, score = self.index.best(utterance, GROUP_SLEEP)
+        return score >= threshold
     
-    def add_response(self, trigger: str, response: str):
+    def add_response(self, trigger: str, response: str, keywords: Optional[Iterable[str]] = None):
         """
         Ajoute une nouvelle réponse prédéfinie.
         
         Args:
             trigger (str): La phrase déclencheur
             response (str): La réponse à donner
+            keywords (Iterable[str], optional): Expressions reconnues sans le modèle
         """
         self.responses[trigger] = response
-        # Recalculer les embeddings
-        self._precompute_embeddings()
+        if keywords is not None:
+            self.keywords[trigger] = list(keywords)
+        # Seul le nouveau déclencheur est encodé
+        self.index.set_label(GROUP_RESPONSES, trigger, [trigger])
+        self.lexicon.remove(GROUP_RESPONSES, trigger)
+        self.lexicon.add(GROUP_RESPONSES, trigger, [trigger, *self.keywords.get(trigger, [])])
     
     def remove_response(self, trigger: str) -> bool:
         """
@@ -87,7 +141,9 @@ class ARKResponses:
         """
         if trigger in self.responses:
             del self.responses[trigger]
-            self._precompute_embeddings()
+            self.keywords.pop(trigger, None)
+            self.index.remove_label(GROUP_RESPONSES, trigger)
+            self.lexicon.remove(GROUP_RESPONSES, trigger)
             return True
         return False
     
@@ -108,4 +164,4 @@ class ARKResponses:
             new_trigger (str): Nouvelle phrase déclencheur
         """
         self.sleep_trigger = new_trigger
-        self.sleep_embedding = self.model.encode([self.sleep_trigger], convert_to_numpy=True)
\ No newline at end of file
+        self.index.set_label(GROUP_SLEEP, GROUP_SLEEP, [self.sleep_trigger])
\ No newline at end of file
@@ -0,0 +1,214 @@
+import json
+import queue
+import threading
+import time
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from ark_pipeline.ark_pipeline import ARKPipeline, TurnResult
+
+
+class ServerBusy(Exception):
+    """File d'attente pleine : le client doit réessayer plus tard."""
+
+
+class _Request:
+    __slots__ = ("phrase", "session", "enqueued_at", "done", "result", "error", "batch_size", "started_at")
+
+    def __init__(self, phrase: str, session: Optional[str] = None):
+        self.phrase = phrase
+        self.session = session
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result: Optional[TurnResult] = None
+        self.error: Optional[Exception] = None
+        self.batch_size = 0
+        self.started_at = 0.0
+
+
+class MicroBatcher:
+    """
+    Regroupe les requêtes arrivées dans une fenêtre de quelques millisecondes et les
+    encode en un seul appel au modèle. Un unique thread exécute le dispatch, ce qui
+    évite tout accès concurrent aux composants d'ARK. La file est bornée : au-delà,
+    `submit` lève ServerBusy (contre-pression).
+    """
+
+    def __init__(self, pipeline: ARKPipeline, window_ms: float = 5.0, max_batch: int = 64,
+                 max_queue: int = 256):
+        self.pipeline = pipeline
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[_Request]" = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ark-batcher", daemon=True)
+        self.batches = 0
+        self.requests = 0
+        self.rejected = 0
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=2)
+
+    def submit(self, phrase: str, session: Optional[str] = None, timeout: float = 30.0) -> _Request:
+        request = _Request(phrase, session)
+        try:
+            self._queue.put_nowait(request)
+        except queue.Full:
+            self.rejected += 1
+            raise ServerBusy()
+        if not request.done.wait(timeout):
+            raise TimeoutError("Pas de réponse du pipeline")
+        if request.error is not None:
+            raise request.error
+        return request
+
+    def _collect(self) -> List[_Request]:
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _session(request: _Request) -> str:
+        # Sans identifiant de session, la pagination ne survit pas à la requête :
+        # "la suite" ne peut jamais reprendre la liste d'un autre client
+        return f"session:{request.session}" if request.session else f"requete:{id(request)}"
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            started = time.perf_counter()
+            try:
+                sessions = [self._session(r) for r in batch]
+                utterances = self.pipeline.encode_batch([r.phrase for r in batch], sessions=sessions)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+                    request.done.set()
+                continue
+            for request, utterance, session in zip(batch, utterances, sessions):
+                request.batch_size = len(batch)
+                request.started_at = started
+                try:
+                    request.result = self.pipeline.process(utterance, session=session)
+                except Exception as e:
+                    request.error = e
+                finally:
+                    if not request.session:
+                        self.pipeline.commands.drop_session(session)
+                request.done.set()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch": self.requests / self.batches if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+            "rejected": self.rejected,
+            "cache": self.pipeline.cache.stats(),
+            "paths": self.pipeline.path_stats(),
+        }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "ARKServer"
+
+    def _send(self, status: int, payload: dict, headers: Optional[dict] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send(200, self.server.batcher.stats())
+        else:
+            self._send(404, {"error": "introuvable"})
+
+    def do_POST(self):
+        if self.path != "/turn":
+            self._send(404, {"error": "introuvable"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            phrase = body.get("phrase", "").strip()
+            session = str(body.get("session") or "")
+        except (ValueError, AttributeError):
+            self._send(400, {"error": "JSON attendu : {\"phrase\": \"...\", \"session\": \"...\"}"})
+            return
+        if not phrase:
+            self._send(400, {"error": "phrase manquante"})
+            return
+
+        try:
+            request = self.server.batcher.submit(phrase, session or None)
+        except ServerBusy:
+            self._send(503, {"error": "serveur saturé, réessayer"}, {"Retry-After": "1"})
+            return
+        except TimeoutError as e:
+            self._send(504, {"error": str(e)})
+            return
+        except Exception as e:
+            self._send(500, {"error": str(e)})
+            return
+
+        finished = time.perf_counter()
+        payload = asdict(request.result)
+        payload.pop("scores", None)
+        payload.update({
+            "latency_ms": round((finished - request.enqueued_at) * 1000, 3),
+            "queue_ms": round((request.started_at - request.enqueued_at) * 1000, 3),
+            "batch_size": request.batch_size,
+        })
+        self._send(200, payload)
+
+    def log_message(self, format, *args):
+        # Pas de journal HTTP par requête sur la console d'ARK
+        pass
+
+
+class ARKServer(ThreadingHTTPServer):
+    """
+    Serveur HTTP local partageant un seul modèle chargé entre plusieurs interfaces
+    (micros, chat...). POST /turn {"phrase": "...", "session": "..."} ; GET /stats ;
+    GET /health. Chaque session a sa propre pagination ("la suite").
+    """
+
+    daemon_threads = True
+
+    def __init__(self, pipeline: ARKPipeline, host: str = "127.0.0.1", port: int = 8765, **batcher_options):
+        super().__init__((host, port), _Handler)
+        self.batcher = MicroBatcher(pipeline, **batcher_options)
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self.batcher.start()
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.batcher.stop()
@@ -0,0 +1,60 @@
+import os
+import time
+from typing import List, Sequence
+from ark_commands.subject_extractor import ExtractedSubject, SubjectOfCommands, SubjectType
+from benchmarks.common import BenchResult, StubEncoder, measure
+
+EXTENSIONS = [".jpg", ".png", ".pdf", ".txt", ".mp4", ".mp3", ".zip", ".md", ".dat"]
+FILES_PER_DIR = 1000
+
+
+def _touch_files(path: str, count: int, offset: int = 0):
+    os.makedirs(path, exist_ok=True)
+    for i in range(offset, offset + count):
+        open(os.path.join(path, f"f{i:07d}{EXTENSIONS[i % len(EXTENSIONS)]}"), "w").close()
+
+
+def build_tree(root: str, n_files: int) -> str:
+    """
+    Arborescence synthétique de `n_files` fichiers, réutilisée d'une exécution à l'autre :
+    `flat/` (un seul dossier) et `nested/` (sous-dossiers de 1000 fichiers).
+    """
+    tree = os.path.join(root, f"tree_{n_files}")
+    marker = os.path.join(tree, ".complete")
+    if os.path.exists(marker):
+        return tree
+    _touch_files(os.path.join(tree, "flat"), n_files)
+    for d in range(0, n_files, FILES_PER_DIR):
+        _touch_files(os.path.join(tree, "nested", f"d{d // FILES_PER_DIR:04d}"), min(FILES_PER_DIR, n_files - d), d)
+    open(marker, "w").close()
+    # Laisser passer la fenêtre de mtime « trop récent » de FileIndex
+    time.sleep(2.1)
+    return tree
+
+
+def run(tree_dir: str, sizes: Sequence[int] = (1000, 100000), repeat: int = 20) -> List[BenchResult]:
+    encoder = StubEncoder()
+    results = []
+    for n in sizes:
+        tree = build_tree(tree_dir, n)
+        flat = os.path.join(tree, "flat")
+        nested = os.path.join(tree, "nested")
+        images = ExtractedSubject(SubjectType.IMAGES, flat, [])
+        files = ExtractedSubject(SubjectType.FILES, flat, [])
+        recursive = ExtractedSubject(SubjectType.IMAGES, nested, [], recursive=True)
+
+        # Index froid : une nouvelle instance par opération
+        results.append(measure(f"count_by_subject_cold[{n}]", [
+            lambda: SubjectOfCommands(encoder, tree).count_by_subject(images) for _ in range(3)]))
+
+        manager = SubjectOfCommands(encoder, tree)
+        results.append(measure(f"count_by_subject_warm[{n}]", [
+            lambda: manager.count_by_subject(images) for _ in range(repeat)]))
+        results.append(measure(f"get_files_by_subject[{n}]", [
+            lambda: manager.get_files_by_subject(files) for _ in range(repeat)]))
+        results.append(measure(f"list_first_10_cold[{n}]", [
+            lambda: list(SubjectOfCommands(encoder, tree).iter_files_by_subject(images, limit=10))
+            for _ in range(3)]))
+        results.append(measure(f"count_recursive[{n}]", [
+            lambda: manager.count_by_subject(recursive, recursive=True) for _ in range(3)]))
+    return results
@@ -0,0 +1,58 @@
+import os
+import tempfile
+from typing import List
+from ark_commands.ark_commands import ARKCommands
+from ark_commands.intent_index import IntentIndex
+from ark_commands.utterance import UtteranceCache
+from ark_pipeline.ark_pipeline import ARKPipeline
+from ark_responses.ark_responses import ARKResponses
+from benchmarks.common import BENCH_DIR, BenchResult, load_bench_encoder, load_corpus, measure
+
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "corpus_fr.txt")
+
+# Dossier personnel factice : les commandes trouvent des lieux réels à résoudre
+HOME_LAYOUT = {
+    "Images": [".jpg", ".png"],
+    "Documents": [".pdf", ".txt", ".docx"],
+    "Vidéos": [".mp4", ".mkv"],
+    "Musique": [".mp3", ".flac"],
+    "Téléchargements": [".zip", ".pdf", ".deb"],
+    "Desktop": [".txt", ".png"],
+}
+
+
+def make_home(root: str, files_per_folder: int = 50) -> str:
+    for folder, extensions in HOME_LAYOUT.items():
+        path = os.path.join(root, folder)
+        os.makedirs(os.path.join(path, "archives"), exist_ok=True)
+        for i in range(files_per_folder):
+            open(os.path.join(path, f"fichier_{i:03d}{extensions[i % len(extensions)]}"), "w").close()
+    return root
+
+
+def run(encoder_name: str = "stub", repeat: int = 5, corpus_path: str = DEFAULT_CORPUS) -> List[BenchResult]:
+    encoder = load_bench_encoder(encoder_name)
+    phrases = load_corpus(corpus_path) * repeat
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="ark-bench-home-") as home:
+        make_home(home)
+        index = IntentIndex(encoder)
+        responses = ARKResponses(encoder, index=index)
+        commands = ARKCommands(encoder, base_path=home, index=index)
+        extractor = commands.subject_manager.extractor
+
+        # Chaque API publique reçoit une chaîne : encodage compris
+        results.append(measure(f"extract_subjects[{encoder_name}]",
+                               [lambda p=p: extractor.extract_subjects(p) for p in phrases]))
+        results.append(measure(f"get_best_command[{encoder_name}]",
+                               [lambda p=p: commands.get_best_command(p) for p in phrases]))
+        results.append(measure(f"get_best_response[{encoder_name}]",
+                               [lambda p=p: responses.get_best_response(p) for p in phrases]))
+
+        # Tour complet, sans puis avec le cache LRU des phrases
+        cold = ARKPipeline(encoder, responses, commands, cache=UtteranceCache(0))
+        results.append(measure(f"pipeline_cold[{encoder_name}]", [lambda p=p: cold.process(p) for p in phrases]))
+        warm = ARKPipeline(encoder, responses, commands, cache=UtteranceCache(256))
+        results.append(measure(f"pipeline_warm[{encoder_name}]", [lambda p=p: warm.process(p) for p in phrases]))
+    return results
@@ -0,0 +1,142 @@
+import json
+import math
+import os
+import time
+import tracemalloc
+import zlib
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+import numpy as np
+from ark_commands.utils import normalize_phrase
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+class StubEncoder:
+    """
+    Encodeur de substitution sans téléchargement de modèle : sac de mots et de
+    trigrammes de caractères hachés dans un vecteur dense. Les similarités sont
+    grossières mais déterministes, ce qui suffit à mesurer le coût du pipeline.
+    """
+
+    name = "stub-hashing"
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        words = normalize_phrase(text).split()
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def encode(self, sentences: Sequence[str], convert_to_numpy: bool = True, **kwargs) -> np.ndarray:
+        out = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for feature in self._features(sentence):
+                h = zlib.crc32(feature.encode("utf-8"))
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return out
+
+
+def load_bench_encoder(name: str):
+    if name == "stub":
+        return StubEncoder()
+    from ark_commands.encoders import load_encoder
+    return load_encoder(name)
+
+
+def load_corpus(path: str) -> List[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+@dataclass
+class BenchResult:
+    name: str
+    ops: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    peak_mem_mb: float
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+def measure(name: str, operations: Sequence[Callable[[], object]], memory: bool = True) -> BenchResult:
+    """
+    Exécute chaque opération une fois en mesurant sa latence, puis (optionnel) une
+    seconde passe sous tracemalloc pour le pic mémoire, afin que le traçage mémoire
+    ne fausse pas les latences.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for op in operations:
+        t0 = time.perf_counter()
+        op()
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+
+    peak = 0.0
+    if memory:
+        tracemalloc.start()
+        for op in operations:
+            op()
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    ordered = sorted(latencies)
+    return BenchResult(
+        name=name, ops=len(latencies), seconds=elapsed,
+        throughput=len(latencies) / elapsed if elapsed else 0.0,
+        p50_ms=_percentile(ordered, 50) * 1000,
+        p95_ms=_percentile(ordered, 95) * 1000,
+        p99_ms=_percentile(ordered, 99) * 1000,
+        peak_mem_mb=peak,
+    )
+
+
+def format_results(results: List[BenchResult]) -> str:
+    lines = [f"{'benchmark':<34}{'ops':>8}{'ops/s':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'pic Mo':>9}"]
+    for r in results:
+        lines.append(f"{r.name:<34}{r.ops:>8}{r.throughput:>11.1f}{r.p50_ms:>10.3f}"
+                     f"{r.p95_ms:>10.3f}{r.p99_ms:>10.3f}{r.peak_mem_mb:>9.2f}")
+    return "\n".join(lines)
+
+
+def save_baseline(results: List[BenchResult], path: str = DEFAULT_BASELINE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({r.name: asdict(r) for r in results}, f, indent=2, ensure_ascii=False)
+
+
+def compare_to_baseline(results: List[BenchResult], path: str = DEFAULT_BASELINE,
+                        tolerance: float = 0.10) -> Optional[List[str]]:
+    """
+    Compare p50 et débit à la référence enregistrée. Retourne les lignes de
+    comparaison, ou None s'il n'y a pas de référence.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            baseline: Dict[str, dict] = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    lines = []
+    for r in results:
+        ref = baseline.get(r.name)
+        if ref is None or not ref["p50_ms"]:
+            lines.append(f"  {r.name:<34} (nouveau)")
+            continue
+        change = (r.p50_ms - ref["p50_ms"]) / ref["p50_ms"]
+        status = "RÉGRESSION" if change > tolerance else ("mieux" if change < -tolerance else "stable")
+        lines.append(f"  {r.name:<34} p50 {ref['p50_ms']:.3f} -> {r.p50_ms:.3f} ms ({change:+.1%}) {status}")
+    return lines
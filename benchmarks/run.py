@@ -0,0 +1,68 @@
+"""
+Banc d'essai hors ligne d'ARK.
+
+    python -m benchmarks.run                          # pipeline texte + disque, encodeur factice
+    python -m benchmarks.run --suite pipeline --encoder torch
+    python -m benchmarks.run --fs-sizes 1000,100000,1000000 --tree-dir /tmp/ark-trees
+    python -m benchmarks.run --save-baseline          # enregistre benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from dataclasses import asdict
+from benchmarks import bench_filesystem, bench_pipeline
+from benchmarks.common import DEFAULT_BASELINE, compare_to_baseline, format_results, save_baseline
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du pipeline d'intentions et des commandes disque")
+    parser.add_argument("--suite", choices=["all", "pipeline", "fs"], default="all")
+    parser.add_argument("--encoder", default="stub", choices=["stub", "torch", "int8", "onnx"],
+                        help="stub : encodeur factice, sans téléchargement de modèle")
+    parser.add_argument("--corpus", default=bench_pipeline.DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=5, help="nombre de relectures du corpus")
+    parser.add_argument("--fs-sizes", default="1000,100000",
+                        help="tailles des arborescences synthétiques (ex. 1000,100000,1000000)")
+    parser.add_argument("--tree-dir", default=os.path.join(tempfile.gettempdir(), "ark-bench-trees"),
+                        help="dossier des arborescences générées (réutilisées entre exécutions)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="écart de p50 toléré avant régression")
+    parser.add_argument("--json", help="écrire les résultats bruts dans ce fichier")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = []
+    if args.suite in ("all", "pipeline"):
+        results += bench_pipeline.run(args.encoder, args.repeat, args.corpus)
+    if args.suite in ("all", "fs"):
+        sizes = [int(s) for s in args.fs_sizes.split(",") if s]
+        os.makedirs(args.tree_dir, exist_ok=True)
+        results += bench_filesystem.run(args.tree_dir, sizes)
+
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump([asdict(r) for r in results], f, indent=2, ensure_ascii=False)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"\nRéférence enregistrée dans {args.baseline}")
+        return 0
+
+    comparison = compare_to_baseline(results, args.baseline, args.tolerance)
+    if comparison is None:
+        print("\nAucune référence : lancer avec --save-baseline pour en créer une.")
+        return 0
+    print("\nComparaison avec la référence :")
+    print("\n".join(comparison))
+    return 1 if any("RÉGRESSION" in line for line in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
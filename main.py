@@ -1,83 +1,235 @@
 import os
+import sys
+import json
 import time
+import argparse
+import threading
+from collections import deque
+from contextlib import redirect_stdout
+from dataclasses import asdict
 import speech_recognition as sr
-from sentence_transformers import SentenceTransformer
 from ark_commands.ark_commands import ARKCommands
 from ark_responses.ark_responses import ARKResponses
+from ark_commands.utterance import UtteranceCache
+from ark_pipeline.ark_pipeline import ARKPipeline
+from ark_pipeline.tracing import TRACER
+from ark_audio.audio_pipeline import AudioPipeline
+from ark_audio.recognizers import GoogleBackend, VoskBackend
+from ark_commands.intent_index import IntentIndex
+from ark_commands.embedding_cache import EmbeddingCache
+from ark_commands.encoders import BACKENDS, load_encoder
+from ark_commands.catalog import CatalogWatcher, load_catalog
 
-def load_model_with_progress():
+MODEL_NAME = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+
+def load_model_with_progress(encoder_backend="torch", onnx_file=None):
     """Charge le modèle avec indicateur de progression."""
-    print("🤖 Chargement du modèle ARK...")
+    print(f"🤖 Chargement du modèle ARK ({encoder_backend})...")
     start_time = time.time()
-    
+
     # Utiliser un modèle plus léger et rapide
-    model = SentenceTransformer(
-        'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2',
-        device='cpu'
-    )
-    
+    model = load_encoder(encoder_backend, MODEL_NAME, onnx_file)
+
     load_time = time.time() - start_time
     print(f"✅ Modèle chargé en {load_time:.2f}s")
     return model
 
-def initialize_components():
-    """Initialise tous les composants avec feedback utilisateur."""
-    print("🚀 Initialisation d'ARK en cours...")
-    
-    # Chargement du modèle
-    model = load_model_with_progress()
-    
+def load_components(cache_size=256, encoder_backend="torch", onnx_file=None, catalog_path=None):
+    """Charge le modèle, pré-calcule les phrases d'ancrage et assemble le pipeline."""
+    model = load_model_with_progress(encoder_backend, onnx_file)
+    catalog = load_catalog(catalog_path)
+
+    # Index d'intentions partagé : un seul produit matriciel par tour.
+    # Les phrases d'ancrage déjà encodées lors d'un précédent démarrage sont lues sur disque.
+    # Le nom inclut le moteur d'inférence : les embeddings quantifiés ont leur propre cache.
+    cache = EmbeddingCache(model, model.name)
+    index = IntentIndex(model, cache=cache)
+
     # Initialisation des composants
     print("📝 Chargement des réponses...")
-    ark_responses = ARKResponses(model)
-    
+    ark_responses = ARKResponses(model, index=index, catalog=catalog)
+
     print("⚡ Chargement des commandes...")
-    commands = ARKCommands(model=model)
-    
+    commands = ARKCommands(model=model, index=index, catalog=catalog)
+
+    # Les phrases retirées du catalogue depuis le dernier démarrage quittent le cache disque
+    cache.compact(index.anchor_phrases())
+
+    # Le catalogue modifié est rechargé entre deux tours, sans redémarrer
+    watcher = CatalogWatcher([ark_responses, commands], catalog_path, catalog=catalog)
+    return ARKPipeline(model, ark_responses, commands, cache=UtteranceCache(cache_size), catalog=watcher)
+
+def initialize_components(cache_size=256, encoder_backend="torch", onnx_file=None, catalog_path=None):
+    """Initialise tous les composants avec feedback utilisateur."""
+    print("🚀 Initialisation d'ARK en cours...")
+
+    pipeline = load_components(cache_size, encoder_backend, onnx_file, catalog_path)
+
     print("🎤 Configuration du microphone...")
     # Initialiser la reconnaissance vocale
     r = sr.Recognizer()
-    
-    return model, ark_responses, commands, r
 
-def listen(r, timeout=None, phrase_limit=5, mic_index=1):
-    """Écoute une phrase avec un timeout optionnel."""
-    with sr.Microphone(device_index=mic_index) as source:
+    return pipeline, r
+
+class BackgroundLoader(threading.Thread):
+    """Charge les composants d'ARK en arrière-plan pendant que l'écoute passive tourne."""
+
+    def __init__(self, cache_size=256, encoder_backend="torch", onnx_file=None, catalog_path=None):
+        super().__init__(name="ark-loader", daemon=True)
+        self.cache_size = cache_size
+        self.encoder_backend = encoder_backend
+        self.onnx_file = onnx_file
+        self.catalog_path = catalog_path
+        self.ready = threading.Event()
+        # Instant (perf_counter) de fin de chargement, indépendant du moment où il est constaté
+        self.ready_at = None
+        self.pipeline = None
+        self.error = None
+
+    def run(self):
         try:
-            audio = r.listen(source, timeout=timeout, phrase_time_limit=phrase_limit)
-            return r.recognize_google(audio, language="fr-FR").lower()
-        except sr.WaitTimeoutError:
-            return ""
+            self.pipeline = load_components(self.cache_size, self.encoder_backend, self.onnx_file,
+                                            self.catalog_path)
         except Exception as e:
-            # print(f"Erreur de reconnaissance: {e}")  # Debug si nécessaire
-            return ""
+            self.error = e
+        finally:
+            self.ready_at = time.perf_counter()
+            self.ready.set()
+
+def handle_phrase(phrase, pipeline):
+    """
+    Traite une phrase en mode actif.
+
+    Returns:
+        bool: False si l'utilisateur demande la mise en veille, True sinon
+    """
+    result = pipeline.process(phrase)
+    print("🤖 ARK :", result.reply)
+    return not result.is_sleep
+
+def create_backend(name="google", vosk_model=None):
+    """Instancie le moteur de reconnaissance vocale demandé."""
+    if name == "vosk":
+        if not vosk_model:
+            raise ValueError("--vosk-model est requis avec --recognizer vosk")
+        return VoskBackend(vosk_model)
+    return GoogleBackend("fr-FR")
+
+def check_encoder(encoder_backend, onnx_file=None, tolerance=0.05):
+    """Vérifie qu'un moteur d'encodage rapide prend les mêmes décisions que la référence."""
+    from ark_pipeline.encoder_check import compare_encoders
+
+    reference = load_encoder("torch", MODEL_NAME)
+    candidate = load_encoder(encoder_backend, MODEL_NAME, onnx_file)
+    report = compare_encoders(reference, candidate, tolerance=tolerance)
+    print(f"📏 {candidate.name} : {report.agreement:.1%} de décisions identiques, "
+          f"écart de score max {report.max_score_delta:.3f}")
+    for phrase, group, expected, got in report.mismatches:
+        print(f"  ✗ [{group}] {phrase!r} : {expected!r} -> {got!r}")
+    return report.within(tolerance)
 
-def main():
+def run_batch(source, output, batch_size=256, cache_size=256, encoder_backend="torch", onnx_file=None,
+              with_scores=False, catalog_path=None):
+    """
+    Mode sans micro : lit une phrase par ligne, applique le même dispatch qu'en
+    mode vocal et écrit un résultat JSON par ligne.
+    """
+    # Les messages de chargement vont sur stderr pour garder une sortie JSON propre
+    with redirect_stdout(sys.stderr):
+        pipeline = load_components(cache_size, encoder_backend, onnx_file, catalog_path)
+
+    start = time.perf_counter()
+    count = 0
+    phrases = (line.strip() for line in source if line.strip())
+    for result in pipeline.process_batch(phrases, batch_size=batch_size, with_scores=with_scores):
+        record = asdict(result)
+        if record["scores"] is None:
+            del record["scores"]
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"✅ {count} phrases traitées en {elapsed:.2f}s", file=sys.stderr)
+    print("🧭 Chemins de décision :", pipeline.path_stats(), file=sys.stderr)
+
+def run_server(host="127.0.0.1", port=8765, window_ms=5.0, cache_size=256, encoder_backend="torch",
+               onnx_file=None, catalog_path=None):
+    """Partage un seul modèle chargé entre plusieurs clients via un serveur HTTP local."""
+    from ark_server.ark_server import ARKServer
+
+    pipeline = load_components(cache_size, encoder_backend, onnx_file, catalog_path)
+    server = ARKServer(pipeline, host, port, window_ms=window_ms)
+    print(f"🌐 ARK à l'écoute sur http://{host}:{port} (POST /turn)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Serveur ARK arrêté.")
+    finally:
+        server.server_close()
+
+def main(lazy_loading=True, cache_size=256, backend=None, encoder_backend="torch", onnx_file=None,
+         calibration=1.0, vad=True, catalog_path=None):
     """Fonction principale optimisée."""
-    # Initialisation avec feedback
-    model, ark_responses, commands, r = initialize_components()
-    
+    startup_time = time.perf_counter()
+
+    if lazy_loading:
+        # Le modèle se charge en arrière-plan : l'écoute passive n'a besoin que
+        # d'une recherche de sous-chaîne pour "activation" et "stop".
+        print("🚀 Initialisation d'ARK en arrière-plan...")
+        loader = BackgroundLoader(cache_size, encoder_backend, onnx_file, catalog_path)
+        loader.start()
+        r = sr.Recognizer()
+    else:
+        loader = None
+        pipeline, r = initialize_components(cache_size, encoder_backend, onnx_file, catalog_path)
+
     # Configuration
     mic_index = 1
     active = False
     last_active_time = 0
     chat_duration = 15  # secondes après activation
-    
+    pending = deque()  # phrases reçues avant que le modèle soit prêt
+    skip_wake_final = False  # activation déclenchée sur une hypothèse partielle
+
+    # Capture et reconnaissance tournent en continu sur leurs propres threads
+    audio = AudioPipeline(r, mic_index=mic_index, phrase_limit=5, backend=backend,
+                          calibration=calibration, vad=vad)
+    audio.start()
+
+    print(f"🎧 Écoute active en {time.perf_counter() - startup_time:.2f}s")
     print("🎯 ARK prêt ! Dites 'activation' pour l'activer.")
     print("💡 Conseil: Dites 'stop' pour quitter complètement.")
-    
+
     try:
         while True:
+            if loader is not None and loader.ready.is_set():
+                if loader.error is not None:
+                    raise loader.error
+                pipeline = loader.pipeline
+                print(f"✅ Modèle prêt en {loader.ready_at - startup_time:.2f}s")
+                loader = None
+
+            # Servir les commandes mises en file pendant le chargement
+            while loader is None and pending:
+                phrase = pending.popleft()
+                print("\n👤 (en attente) Tu as dit :", phrase)
+                if not handle_phrase(phrase, pipeline):
+                    active = False
+                    pending.clear()
+                last_active_time = time.time()
+
             if not active:
-                phrase = listen(r, timeout=None, phrase_limit=5, mic_index=mic_index)
-                if not phrase:
+                # Timeout court pour servir la file dès que le modèle est prêt
+                transcript = audio.next_transcript(timeout=1 if pending else None)
+                if transcript is None:
                     continue
-                    
-                if "activation" in phrase:
+
+                # Le mot d'activation est repéré dès les hypothèses partielles
+                if "activation" in transcript.text:
                     active = True
+                    skip_wake_final = not transcript.final
                     last_active_time = time.time()
                     print("✨ ARK activé ! Je t'écoute...")
-                elif "stop" in phrase:
+                elif transcript.final and "stop" in transcript.text:
                     print("👋 ARK désactivé. À bientôt !")
                     break
             else:
@@ -87,35 +239,101 @@ def main():
                     active = False
                     continue
 
-                phrase = listen(r, timeout=3, phrase_limit=5, mic_index=mic_index)
-                if not phrase:
+                transcript = audio.next_transcript(timeout=3)
+                if transcript is None:
                     continue
 
+                if not transcript.final:
+                    # Encoder l'hypothèse partielle pendant que l'utilisateur parle encore,
+                    # sauf si une transcription plus récente attend déjà
+                    if loader is None and len(transcript.text.split()) > 1 and not audio.has_pending():
+                        pipeline.prefetch(transcript.text)
+                    continue
+
+                phrase = transcript.text
+                if skip_wake_final:
+                    # Fin de la phrase qui contenait le mot d'activation
+                    skip_wake_final = False
+                    if "activation" in phrase:
+                        continue
+
                 print("\n👤 Tu as dit :", phrase)
 
-                # Vérification mise en veille
-                if ark_responses.is_sleep_command(phrase):
-                    print("🤖 ARK : À bientôt !")
+                if loader is not None:
+                    pending.append(phrase)
+                    print("⏳ ARK termine son chargement, ta demande est mise en file...")
+                elif not handle_phrase(phrase, pipeline):
                     active = False
                     continue
 
-                # Détection des commandes
-                result = commands.get_best_command(phrase)
-                if result is not None:
-                    print("🤖 ARK :", result)
-                else:
-                    # Utiliser les réponses prédéfinies
-                    response = ark_responses.get_best_response(phrase)
-                    print("🤖 ARK :", response)
-
                 last_active_time = time.time()
-                
+
     except KeyboardInterrupt:
         print("\n👋 ARK interrompu par l'utilisateur. À bientôt !")
     except Exception as e:
         print(f"❌ Erreur inattendue : {e}")
     finally:
         print("🔄 Nettoyage en cours...")
+        audio.stop()
+        print("🎙️ Audio :", audio.stats())
+        if TRACER.enabled:
+            print("⏱️ Latences par étape :")
+            print(TRACER.report())
+            TRACER.disable()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ARK - assistant vocal")
+    parser.add_argument("--eager", action="store_true",
+                        help="charger le modèle avant de démarrer l'écoute")
+    parser.add_argument("--cache-size", type=int, default=256,
+                        help="nombre de phrases mémorisées (embeddings et intentions)")
+    parser.add_argument("--recognizer", choices=["google", "vosk"], default="google",
+                        help="moteur de reconnaissance vocale (vosk : local, hors ligne)")
+    parser.add_argument("--vosk-model", help="dossier du modèle Vosk")
+    parser.add_argument("--calibration", type=float, default=1.0,
+                        help="durée (s) de la calibration unique du bruit ambiant, 0 pour la désactiver")
+    parser.add_argument("--no-vad", action="store_true",
+                        help="transmettre tout l'audio au moteur, silence compris")
+    parser.add_argument("--catalog", help="catalogue d'intentions JSON, rechargé à chaud s'il est modifié")
+    parser.add_argument("--encoder", choices=BACKENDS, default="torch",
+                        help="moteur d'inférence de l'encodeur de phrases")
+    parser.add_argument("--onnx-file", help="variante ONNX, ex. onnx/model_qint8_avx2.onnx")
+    parser.add_argument("--trace", action="store_true",
+                        help="mesurer la latence de chaque étape (p50/p95/p99 affichés à la sortie)")
+    parser.add_argument("--trace-file", help="écrire une trace JSON par tour dans ce fichier (implique --trace)")
+    parser.add_argument("--batch", metavar="FICHIER",
+                        help="mode texte : traiter les phrases d'un fichier ('-' pour stdin), sortie JSON lines")
+    parser.add_argument("--batch-size", type=int, default=256, help="phrases encodées par appel au modèle")
+    parser.add_argument("--output", help="fichier de sortie du mode texte (stdout par défaut)")
+    parser.add_argument("--with-scores", action="store_true",
+                        help="inclure le meilleur score de chaque famille d'intentions")
+    parser.add_argument("--serve", action="store_true", help="démarrer le serveur HTTP local partagé")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--batch-window-ms", type=float, default=5.0,
+                        help="fenêtre de regroupement des requêtes du serveur")
+    parser.add_argument("--check-encoder", action="store_true",
+                        help="comparer les décisions de --encoder au modèle pleine précision puis quitter")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.trace or args.trace_file:
+        TRACER.enable(args.trace_file)
+    if args.check_encoder:
+        sys.exit(0 if check_encoder(args.encoder, args.onnx_file) else 1)
+    if args.serve:
+        run_server(args.host, args.port, args.batch_window_ms, args.cache_size, args.encoder, args.onnx_file,
+                   args.catalog)
+        sys.exit(0)
+    if args.batch:
+        source = sys.stdin if args.batch == "-" else open(args.batch, "r", encoding="utf-8")
+        output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+        with source, output:
+            run_batch(source, output, args.batch_size, args.cache_size, args.encoder, args.onnx_file,
+                      args.with_scores, args.catalog)
+        sys.exit(0)
+    main(lazy_loading=not args.eager, cache_size=args.cache_size,
+         backend=create_backend(args.recognizer, args.vosk_model),
+         encoder_backend=args.encoder, onnx_file=args.onnx_file,
+         calibration=args.calibration, vad=not args.no_vad, catalog_path=args.catalog)
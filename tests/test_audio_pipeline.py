@@ -0,0 +1,66 @@
+import random
+import wave
+import speech_recognition as sr
+from ark_audio.audio_pipeline import AudioPipeline
+from ark_audio.recognizers import WavReplayBackend
+
+
+def _write_wav(path, seed, seconds=0.5, rate=16000):
+    rng = random.Random(seed)
+    frames = b"".join(rng.randrange(-3000, 3000).to_bytes(2, "little", signed=True)
+                      for _ in range(int(seconds * rate)))
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(frames)
+    return str(path)
+
+
+def _transcripts(audio, count):
+    out = []
+    for _ in range(count):
+        transcript = audio.next_transcript(timeout=5)
+        assert transcript is not None
+        out.append(transcript)
+    return out
+
+
+def test_replay_publishes_partials_then_finals(tmp_path):
+    backend = WavReplayBackend({
+        _write_wav(tmp_path / "activation.wav", 1): "Activation ARK",
+        _write_wav(tmp_path / "commande.wav", 2): "combien de photos",
+    })
+    audio = AudioPipeline(sr.Recognizer(), segments=backend.segments(), backend=backend)
+    assert not audio.frame_mode
+    audio.start()
+    try:
+        got = [(t.text, t.final) for t in _transcripts(audio, 5)]
+        assert audio.next_transcript(timeout=0.2) is None
+    finally:
+        audio.stop()
+
+    assert got == [
+        ("activation", False),
+        ("activation ark", True),
+        ("combien", False),
+        ("combien de", False),
+        ("combien de photos", True),
+    ]
+    assert audio.stats()["recognitions"] == 2
+
+
+def test_wake_word_seen_before_final(tmp_path):
+    # Le mot d'activation est détecté sur la première hypothèse partielle, comme dans main
+    backend = WavReplayBackend({_write_wav(tmp_path / "activation.wav", 3): "activation liste les photos"})
+    audio = AudioPipeline(sr.Recognizer(), segments=backend.segments(), backend=backend)
+    audio.start()
+    try:
+        first = audio.next_transcript(timeout=5)
+        assert first is not None and "activation" in first.text and not first.final
+        rest = _transcripts(audio, 3)
+    finally:
+        audio.stop()
+
+    assert rest[-1].final and rest[-1].text == "activation liste les photos"
+    assert all(t.captured_at <= t.recognized_at for t in [first] + rest)